@@ -1,15 +1,395 @@
 import asyncio
+import json
 import logging
-from typing import Optional, Union
+import re
+import sqlite3
+import time
+from contextlib import contextmanager
+from collections import OrderedDict, defaultdict, deque
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Set, Tuple, Union
 
 import discord
 from discord.ext import tasks
 from redbot.core import Config, checks, commands
 from redbot.core.bot import Red
+from redbot.core.data_manager import cog_data_path
 from redbot.core.utils.chat_formatting import box, pagify
 
 log = logging.getLogger("red.honeypot")
 
+# Nombre maximal d'entrées de cooldown gardées en mémoire
+COOLDOWN_CACHE_SIZE = 50_000
+COOLDOWN_SWEEP_INTERVAL = 60
+
+# Mode raid : délai de regroupement, bans simultanés, limites Discord
+RAID_BATCH_DELAY = 2
+RAID_CONCURRENCY = 5
+BULK_BAN_LIMIT = 200
+BULK_DELETE_LIMIT = 100
+
+# File des effets secondaires (DM, logs, compteurs)
+SIDE_EFFECT_QUEUE_SIZE = 1000
+SIDE_EFFECT_WORKERS = 3
+SIDE_EFFECT_RETRIES = 3
+SIDE_EFFECT_DRAIN_TIMEOUT = 10
+
+# Compteurs de déclenchements : écriture groupée et historique par membre
+TRIGGER_FLUSH_INTERVAL = 60
+TRIGGER_HISTORY_SIZE = 20
+
+SHARED_ACTIONS = ("ban", "kick", "mute", "log")
+
+MAX_PATTERN_LENGTH = 200
+
+# Journal d'audit JSONL : rotation au-delà de cette taille
+AUDIT_MAX_BYTES = 10 * 1024 * 1024
+AUDIT_BUFFER_LIMIT = 10_000
+
+
+def build_keyword_pattern(keywords: List[str]) -> str:
+    """
+    Construire une expression régulière en arbre de préfixes pour des mots-clés.
+
+    Les préfixes communs sont factorisés : le moteur ne compare qu'un
+    caractère par niveau au lieu d'essayer chaque mot-clé, et le coût par
+    message reste stable quand la liste atteint des milliers d'entrées.
+    """
+    trie: dict = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def to_regex(node: dict) -> str:
+        branches = [re.escape(char) + to_regex(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        pattern = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if "" in node:
+            pattern = "(?:" + pattern + ")?"
+        return pattern
+
+    return to_regex(trie)
+
+
+# Constructions qui cassent une fois les regex jointes en une seule expression
+UNSAFE_REGEX = re.compile(r"\(\?[aiLmsux]+\)|\(\?P[<=]|\\[1-9]|\\g<")
+
+
+def check_regex(regex: str) -> Optional[str]:
+    """Retourner une erreur si la regex ne peut pas être combinée aux autres."""
+    try:
+        re.compile(regex)
+    except re.error as e:
+        return f"Regex invalide: {e}"
+    if UNSAFE_REGEX.search(regex):
+        return (
+            "Drapeaux globaux `(?i)`, groupes nommés et références arrière "
+            "ne sont pas acceptés (les motifs sont déjà insensibles à la casse)."
+        )
+    return None
+
+
+def compile_matcher(keywords: List[str], regexes: List[str]) -> Optional["re.Pattern"]:
+    """Compiler mots-clés et regex d'un serveur en une seule expression."""
+    parts = []
+    if keywords:
+        # Les mots-clés ne correspondent qu'à des mots entiers
+        parts.append(r"(?<!\w)" + build_keyword_pattern(sorted(set(keywords))) + r"(?!\w)")
+    parts.extend(f"(?:{regex})" for regex in regexes)
+    if not parts:
+        return None
+    return re.compile("|".join(parts), re.IGNORECASE)
+
+
+class CooldownCache:
+    """
+    Cooldowns par (guild_id, user_id) avec expiration et taille bornée.
+
+    Les entrées expirées sont purgées périodiquement par `sweep()` ; au-delà
+    de `maxsize`, les plus anciennes sont évincées. La mémoire reste donc
+    stable même après un raid de milliers de comptes.
+    """
+
+    def __init__(self, maxsize: int = COOLDOWN_CACHE_SIZE) -> None:
+        self.maxsize = maxsize
+        self._expires: "OrderedDict[Tuple[int, int], float]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._expires)
+
+    def check(self, guild_id: int, user_id: int, cooldown: float) -> bool:
+        """
+        Retourner True si l'utilisateur est encore en cooldown.
+
+        Sinon, démarrer un nouveau cooldown et retourner False.
+        """
+        key = (guild_id, user_id)
+        now = time.monotonic()
+        expires_at = self._expires.get(key)
+        if expires_at is not None and expires_at > now:
+            self.hits += 1
+            return True
+
+        self.misses += 1
+        self._expires[key] = now + cooldown
+        self._expires.move_to_end(key)
+        # Les entrées les plus anciennes sont en tête, éviction en O(1)
+        while len(self._expires) > self.maxsize:
+            self._expires.popitem(last=False)
+            self.evictions += 1
+        return False
+
+    def sweep(self) -> int:
+        """Supprimer les entrées expirées, retourner leur nombre."""
+        now = time.monotonic()
+        expired = [key for key, expires_at in self._expires.items() if expires_at <= now]
+        for key in expired:
+            del self._expires[key]
+        self.expirations += len(expired)
+        return len(expired)
+
+    def clear(self) -> None:
+        self._expires.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "size": len(self._expires),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+class SideEffectQueue:
+    """
+    File bornée de tâches secondaires exécutées en arrière-plan.
+
+    Les erreurs Discord temporaires (429, 5xx) sont réessayées ; quand la
+    file est pleine, les nouvelles tâches sont abandonnées et comptées.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = SIDE_EFFECT_QUEUE_SIZE,
+        workers: int = SIDE_EFFECT_WORKERS,
+        retries: int = SIDE_EFFECT_RETRIES,
+    ) -> None:
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.workers = workers
+        self.retries = retries
+        self._tasks: List[asyncio.Task] = []
+        self.submitted = 0
+        self.completed = 0
+        self.retried = 0
+        self.failed = 0
+        self.dropped = 0
+
+    def start(self) -> None:
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    def submit(self, name: str, func, *args) -> bool:
+        """Ajouter une tâche sans attendre ; retourner False si abandonnée."""
+        try:
+            self.queue.put_nowait((name, func, args))
+        except asyncio.QueueFull:
+            self.dropped += 1
+            log.warning(f"File des effets secondaires pleine, tâche {name} abandonnée")
+            return False
+        self.submitted += 1
+        return True
+
+    async def _worker(self) -> None:
+        while True:
+            name, func, args = await self.queue.get()
+            try:
+                await self._run(name, func, args)
+            finally:
+                self.queue.task_done()
+
+    async def _run(self, name: str, func, args) -> None:
+        for attempt in range(self.retries + 1):
+            try:
+                await func(*args)
+                self.completed += 1
+                return
+            except discord.HTTPException as e:
+                if (e.status == 429 or e.status >= 500) and attempt < self.retries:
+                    self.retried += 1
+                    await asyncio.sleep(2 ** attempt)
+                    continue
+                log.warning(f"Échec de la tâche {name}: {e}")
+            except Exception:
+                log.exception(f"Erreur dans la tâche {name}")
+            self.failed += 1
+            return
+
+    async def drain(self, timeout: float = SIDE_EFFECT_DRAIN_TIMEOUT) -> None:
+        """Attendre la fin des tâches en cours puis arrêter les workers."""
+        try:
+            await asyncio.wait_for(self.queue.join(), timeout)
+        except asyncio.TimeoutError:
+            log.warning(f"{self.queue.qsize()} tâche(s) secondaire(s) abandonnée(s) au déchargement")
+        for task in self._tasks:
+            task.cancel()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "pending": self.queue.qsize(),
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "retried": self.retried,
+            "failed": self.failed,
+            "dropped": self.dropped,
+        }
+
+
+class OffenderIndex:
+    """
+    Index partagé entre serveurs des utilisateurs ayant déclenché un honeypot.
+
+    Stocké dans une base SQLite (une ligne par utilisateur), chargé en
+    mémoire sous forme d'ensemble d'IDs au premier besoin : la vérification
+    d'appartenance est en O(1). Les ajouts sont écrits par lots.
+    """
+
+    def __init__(self, path) -> None:
+        self.path = str(path)
+        self.ids: Optional[set] = None
+        self._pending: Dict[int, Tuple[float, int]] = {}
+        self._lock = asyncio.Lock()
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Connexion valide le temps d'un appel : validée puis fermée."""
+        conn = sqlite3.connect(self.path)
+        try:
+            with conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS offenders ("
+                    "user_id INTEGER PRIMARY KEY, first_seen REAL, last_seen REAL, count INTEGER)"
+                )
+                yield conn
+        finally:
+            conn.close()
+
+    def _read_ids(self) -> set:
+        with self._connect() as conn:
+            return {row[0] for row in conn.execute("SELECT user_id FROM offenders")}
+
+    def _write(self, rows: List[Tuple[int, float, int]]) -> None:
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT INTO offenders (user_id, first_seen, last_seen, count) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(user_id) DO UPDATE SET last_seen = MAX(last_seen, excluded.last_seen), "
+                "count = count + excluded.count",
+                [(user_id, seen, seen, count) for user_id, seen, count in rows],
+            )
+
+    def _read_one(self, user_id: int) -> Optional[tuple]:
+        with self._connect() as conn:
+            return conn.execute(
+                "SELECT first_seen, last_seen, count FROM offenders WHERE user_id = ?", (user_id,)
+            ).fetchone()
+
+    async def _run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+    async def load(self) -> None:
+        """Charger les IDs en mémoire (une seule fois)."""
+        if self.ids is not None:
+            return
+        async with self._lock:
+            if self.ids is None:
+                self.ids = await self._run(self._read_ids)
+
+    def __contains__(self, user_id: int) -> bool:
+        return self.ids is not None and user_id in self.ids
+
+    def __len__(self) -> int:
+        return len(self.ids) if self.ids is not None else 0
+
+    def add(self, user_id: int, timestamp: float) -> None:
+        """Ajouter un déclenchement (écrit au prochain `flush`)."""
+        if self.ids is not None:
+            self.ids.add(user_id)
+        last_seen, count = self._pending.get(user_id, (0, 0))
+        self._pending[user_id] = (max(last_seen, timestamp), count + 1)
+
+    async def flush(self) -> None:
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, {}
+        rows = [(user_id, seen, count) for user_id, (seen, count) in pending.items()]
+        try:
+            await self._run(self._write, rows)
+        except BaseException:
+            # Remettre les ajouts non écrits pour le prochain passage
+            for user_id, (seen, count) in pending.items():
+                last_seen, newer = self._pending.get(user_id, (0, 0))
+                self._pending[user_id] = (max(last_seen, seen), count + newer)
+            raise
+
+    async def get(self, user_id: int) -> Optional[dict]:
+        """Détails d'un utilisateur de l'index, ou None."""
+        await self.flush()
+        row = await self._run(self._read_one, user_id)
+        if row is None:
+            return None
+        return {"first_seen": row[0], "last_seen": row[1], "count": row[2]}
+
+
+class AuditLog:
+    """
+    Journal d'audit local au format JSONL, une ligne par déclenchement.
+
+    Les lignes sont gardées en mémoire puis écrites par lots hors de la
+    boucle d'événements. Au-delà de `max_bytes`, le fichier est renommé
+    en `.1` (une seule génération conservée).
+    """
+
+    def __init__(self, path, max_bytes: int = AUDIT_MAX_BYTES) -> None:
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self._buffer: List[str] = []
+        self.dropped = 0
+
+    def record(self, **entry) -> None:
+        if len(self._buffer) >= AUDIT_BUFFER_LIMIT:
+            self.dropped += 1
+            return
+        self._buffer.append(json.dumps(entry, ensure_ascii=False))
+
+    def _write(self, lines: List[str]) -> None:
+        if self.path.exists() and self.path.stat().st_size > self.max_bytes:
+            self.path.replace(self.path.with_name(self.path.name + ".1"))
+        with self.path.open("a", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+
+    async def flush(self) -> None:
+        if not self._buffer:
+            return
+        lines, self._buffer = self._buffer, []
+        await asyncio.get_running_loop().run_in_executor(None, self._write, lines)
+
+
+async def timed(coro) -> Tuple[object, float]:
+    """Attendre une coroutine et retourner (résultat, durée en secondes)."""
+    started = time.perf_counter()
+    result = await coro
+    return result, time.perf_counter() - started
+
+
+def ms(seconds: float) -> float:
+    return round(seconds * 1000, 3)
+
 
 class Honeypot(commands.Cog):
     """
@@ -35,19 +415,83 @@ class Honeypot(commands.Cog):
             "excluded_roles": [],
             "excluded_users": [],
             "cooldown": 5,  # secondes entre les actions
+            "raid_threshold": 5,  # déclenchements ...
+            "raid_window": 10,  # ... en N secondes pour passer en mode raid
+            "shared_index": False,  # participer à l'index partagé entre serveurs
+            "shared_action": "log",  # action à l'arrivée d'un utilisateur listé
+            "exempt_managers": False,  # ignorer les membres avec la permission Gérer le serveur
+            "exempt_above_role": None,  # ignorer les membres dont le rôle le plus haut est au-dessus
+            "keywords": [],  # déclencheurs par contenu, dans tous les channels
+            "regexes": [],
         }
 
         default_member = {
             "triggered_count": 0,
             "last_trigger": 0,
+            "history": [],  # derniers déclenchements {time, channel, action}
         }
 
         self.config.register_guild(**default_guild)
         self.config.register_member(**default_member)
         
         # Cache pour éviter le spam
-        self.action_cache = {}
+        self.action_cache = CooldownCache()
+        self.sweep_cooldowns.start()
+        
+        # Instantané de la config par serveur (invalidé par les commandes)
+        self.guild_cache = {}
+        
+        # Expressions compilées par serveur, reconstruites seulement quand
+        # la liste des motifs change
+        self.matchers: Dict[int, Optional["re.Pattern"]] = {}
+        
+        # Mode raid : horodatages des déclenchements et file d'attente par serveur
+        self.raid_triggers: Dict[int, deque] = defaultdict(deque)
+        self.raid_until: Dict[int, float] = {}
+        self.raid_queues: Dict[int, List[discord.Message]] = {}
+        self.raid_tasks: Set[asyncio.Task] = set()
+        
+        # DM, logs et compteurs ne bloquent pas la modération
+        self.side_effects = SideEffectQueue()
+        self.side_effects.start()
         
+        # Déclenchements pas encore écrits, par (guild_id, user_id)
+        self.pending_triggers: Dict[Tuple[int, int], dict] = {}
+        self.flush_lock = asyncio.Lock()
+        
+        # Index partagé des contrevenants, chargé au premier besoin
+        self.offenders = OffenderIndex(cog_data_path(self) / "offenders.sqlite3")
+        
+        # Journal d'audit de chaque déclenchement
+        self.audit = AuditLog(cog_data_path(self) / "audit.jsonl")
+        self.flush_triggers.start()
+        
+    async def get_guild_config(self, guild: discord.Guild) -> dict:
+        """Retourner la config du serveur depuis le cache mémoire."""
+        config = self.guild_cache.get(guild.id)
+        if config is None:
+            config = await self.config.guild(guild).all()
+            config["channel_ids"] = set(config["honeypot_channels"])
+            config["excluded_role_ids"] = frozenset(config["excluded_roles"])
+            config["excluded_user_ids"] = frozenset(config["excluded_users"])
+            if guild.id not in self.matchers:
+                try:
+                    matcher = compile_matcher(config["keywords"], config["regexes"])
+                except re.error as e:
+                    # Une regex enregistrée avant la validation ne doit pas bloquer le cog
+                    log.error(f"Regex du serveur {guild.id} ignorées, motifs incompatibles: {e}")
+                    matcher = compile_matcher(config["keywords"], [])
+                self.matchers[guild.id] = matcher
+            config["matcher"] = self.matchers[guild.id]
+            self.guild_cache[guild.id] = config
+        return config
+
+    def invalidate_guild(self, guild: discord.Guild, patterns: bool = False) -> None:
+        """Oublier la config en cache après une modification."""
+        self.guild_cache.pop(guild.id, None)
+        if patterns:
+            self.matchers.pop(guild.id, None)
+
     def format_help_for_context(self, ctx: commands.Context) -> str:
         """Format d'aide du cog."""
         return f"{super().format_help_for_context(ctx)}\n\nVersion: 2.0.0"
@@ -73,6 +517,7 @@ class Honeypot(commands.Cog):
                 return
             channels.append(channel.id)
         
+        self.invalidate_guild(ctx.guild)
         await ctx.send(f"✅ {channel.mention} ajouté aux honeypots.")
         log.info(f"Channel {channel.id} ajouté aux honeypots sur {ctx.guild.id}")
 
@@ -85,6 +530,7 @@ class Honeypot(commands.Cog):
                 return
             channels.remove(channel.id)
         
+        self.invalidate_guild(ctx.guild)
         await ctx.send(f"✅ {channel.mention} retiré des honeypots.")
         log.info(f"Channel {channel.id} retiré des honeypots sur {ctx.guild.id}")
 
@@ -129,12 +575,14 @@ class Honeypot(commands.Cog):
             return
         
         await self.config.guild(ctx.guild).action.set(action.lower())
+        self.invalidate_guild(ctx.guild)
         await ctx.send(f"✅ Action définie sur: **{action.lower()}**")
 
     @honeypot.command(name="muterole")
     async def honeypot_mute_role(self, ctx: commands.Context, role: discord.Role) -> None:
         """Définir le rôle utilisé pour mute les utilisateurs."""
         await self.config.guild(ctx.guild).mute_role.set(role.id)
+        self.invalidate_guild(ctx.guild)
         await ctx.send(f"✅ Rôle mute défini sur: {role.mention}")
 
     @honeypot.command(name="logchannel")
@@ -146,11 +594,13 @@ class Honeypot(commands.Cog):
         else:
             await self.config.guild(ctx.guild).log_channel.set(channel.id)
             await ctx.send(f"✅ Channel de logs défini sur: {channel.mention}")
+        self.invalidate_guild(ctx.guild)
 
     @honeypot.command(name="autodelete")
     async def honeypot_auto_delete(self, ctx: commands.Context, enabled: bool) -> None:
         """Activer/désactiver la suppression automatique des messages."""
         await self.config.guild(ctx.guild).auto_delete.set(enabled)
+        self.invalidate_guild(ctx.guild)
         status = "activée" if enabled else "désactivée"
         await ctx.send(f"✅ Suppression automatique {status}.")
 
@@ -171,6 +621,7 @@ class Honeypot(commands.Cog):
                     await ctx.send(f"✅ Utilisateur {target.mention} exclu des honeypots.")
                 else:
                     await ctx.send(f"❌ Utilisateur {target.mention} déjà exclu.")
+        self.invalidate_guild(ctx.guild)
 
     @honeypot.command(name="unexclude")
     async def honeypot_unexclude(self, ctx: commands.Context, target: Union[discord.Role, discord.Member]) -> None:
@@ -189,6 +640,25 @@ class Honeypot(commands.Cog):
                     await ctx.send(f"✅ Utilisateur {target.mention} plus exclu des honeypots.")
                 else:
                     await ctx.send(f"❌ Utilisateur {target.mention} n'était pas exclu.")
+        self.invalidate_guild(ctx.guild)
+
+    @honeypot.command(name="exemptmanagers")
+    async def honeypot_exempt_managers(self, ctx: commands.Context, enabled: bool) -> None:
+        """Ignorer (ou non) les membres ayant la permission Gérer le serveur."""
+        await self.config.guild(ctx.guild).exempt_managers.set(enabled)
+        self.invalidate_guild(ctx.guild)
+        status = "ignorés" if enabled else "surveillés"
+        await ctx.send(f"✅ Membres avec Gérer le serveur {status}.")
+
+    @honeypot.command(name="exemptabove")
+    async def honeypot_exempt_above(self, ctx: commands.Context, role: Optional[discord.Role] = None) -> None:
+        """Ignorer les membres dont le rôle le plus haut est au-dessus de ce rôle (vide pour désactiver)."""
+        await self.config.guild(ctx.guild).exempt_above_role.set(role.id if role else None)
+        self.invalidate_guild(ctx.guild)
+        if role:
+            await ctx.send(f"✅ Membres au-dessus de {role.mention} ignorés.")
+        else:
+            await ctx.send("✅ Exemption par position désactivée.")
 
     @honeypot.command(name="settings", aliases=["config"])
     async def honeypot_settings(self, ctx: commands.Context) -> None:
@@ -233,27 +703,265 @@ class Honeypot(commands.Cog):
         embed.add_field(name="Rôle mute", value=mute_role, inline=True)
         embed.add_field(name="DM utilisateur", value="✅" if config["dm_user"] else "❌", inline=True)
         embed.add_field(name="Cooldown", value=f"{config['cooldown']}s", inline=True)
+        raid = f"{config['raid_threshold']} en {config['raid_window']}s" if config["raid_threshold"] else "Désactivé"
+        embed.add_field(name="Mode raid", value=raid, inline=True)
         
         await ctx.send(embed=embed)
 
+    @honeypot.command(name="raid")
+    async def honeypot_raid(self, ctx: commands.Context, threshold: int, window: int) -> None:
+        """
+        Configurer la détection de raid.
+
+        Au-delà de `threshold` déclenchements en `window` secondes, les
+        contrevenants sont traités par lots (bans groupés, un seul log).
+        Mettre 0 comme seuil pour désactiver.
+        """
+        threshold = max(threshold, 0)
+        window = max(window, 1)
+        await self.config.guild(ctx.guild).raid_threshold.set(threshold)
+        await self.config.guild(ctx.guild).raid_window.set(window)
+        self.invalidate_guild(ctx.guild)
+        if threshold:
+            await ctx.send(f"✅ Mode raid au-delà de **{threshold}** déclenchements en **{window}s**.")
+        else:
+            await ctx.send("✅ Détection de raid désactivée.")
+
+    @honeypot.command(name="stats", aliases=["leaderboard"])
+    async def honeypot_stats(self, ctx: commands.Context, top: int = 10) -> None:
+        """Classement des membres ayant le plus déclenché le honeypot."""
+        members = await self.config.all_members(ctx.guild)
+        counts = {user_id: data["triggered_count"] for user_id, data in members.items()}
+        for (guild_id, user_id), pending in self.pending_triggers.items():
+            if guild_id == ctx.guild.id:
+                counts[user_id] = counts.get(user_id, 0) + pending["count"]
+
+        ranking = sorted(((count, user_id) for user_id, count in counts.items() if count), reverse=True)
+        if not ranking:
+            await ctx.send("❌ Aucun déclenchement enregistré.")
+            return
+
+        top = max(1, min(top, 50))
+        lines = []
+        for position, (count, user_id) in enumerate(ranking[:top], start=1):
+            member = ctx.guild.get_member(user_id)
+            name = str(member) if member else f"Utilisateur {user_id}"
+            lines.append(f"{position:>2}. {name} - {count}")
+
+        embed = discord.Embed(
+            title="🍯 Classement Honeypot",
+            description=box("\n".join(lines)),
+            color=discord.Color.gold()
+        )
+        embed.set_footer(text=f"{len(ranking)} membre(s) au total")
+        await ctx.send(embed=embed)
+
+    @honeypot.command(name="history")
+    async def honeypot_history(self, ctx: commands.Context, user: Union[discord.Member, discord.User, int]) -> None:
+        """Historique des déclenchements d'un utilisateur."""
+        user_id = user if isinstance(user, int) else user.id
+        data = await self.get_member_triggers(ctx.guild.id, user_id)
+        if not data["triggered_count"]:
+            await ctx.send("❌ Aucun déclenchement pour cet utilisateur.")
+            return
+
+        lines = []
+        for entry in reversed(data["history"]):
+            channel = ctx.guild.get_channel(entry["channel"])
+            where = f"#{channel.name}" if channel else str(entry["channel"])
+            lines.append(f"<t:{int(entry['time'])}:f> - {where} - {entry['action']}")
+
+        embed = discord.Embed(
+            title=f"🍯 Historique de {user if not isinstance(user, int) else user_id}",
+            color=discord.Color.gold()
+        )
+        embed.add_field(name="Déclenchements", value=data["triggered_count"], inline=True)
+        embed.add_field(name="Dernier", value=f"<t:{int(data['last_trigger'])}:R>", inline=True)
+        if lines:
+            embed.add_field(name="Derniers événements", value="\n".join(lines)[:1024], inline=False)
+        await ctx.send(embed=embed)
+
+    @honeypot.command(name="shared")
+    async def honeypot_shared(self, ctx: commands.Context, enabled: bool, action: str = "log") -> None:
+        """
+        Participer à l'index partagé des contrevenants entre serveurs.
+
+        Les utilisateurs qui déclenchent un honeypot ici sont ajoutés à
+        l'index, et ceux déjà listés subissent `action` dès leur arrivée.
+        Actions: ban, kick, mute, log (signalement seul).
+        """
+        action = action.lower()
+        if action not in SHARED_ACTIONS:
+            await ctx.send(f"❌ Action invalide. Actions disponibles: {', '.join(SHARED_ACTIONS)}")
+            return
+
+        await self.config.guild(ctx.guild).shared_index.set(enabled)
+        await self.config.guild(ctx.guild).shared_action.set(action)
+        self.invalidate_guild(ctx.guild)
+        if enabled:
+            await self.offenders.load()
+            await ctx.send(f"✅ Index partagé activé ({len(self.offenders)} utilisateur(s) listé(s)), action: **{action}**.")
+        else:
+            await ctx.send("✅ Index partagé désactivé.")
+
+    @honeypot.command(name="lookup")
+    async def honeypot_lookup(self, ctx: commands.Context, user: Union[discord.Member, discord.User, int]) -> None:
+        """Chercher un utilisateur dans l'index partagé."""
+        user_id = user if isinstance(user, int) else user.id
+        entry = await self.offenders.get(user_id)
+        if entry is None:
+            await ctx.send("✅ Utilisateur absent de l'index partagé.")
+            return
+        await ctx.send(
+            f"⚠️ Utilisateur listé : **{entry['count']}** déclenchement(s), "
+            f"première fois <t:{int(entry['first_seen'])}:R>, dernière <t:{int(entry['last_seen'])}:R>."
+        )
+
+    @honeypot.group(name="pattern", aliases=["patterns"])
+    async def honeypot_pattern(self, ctx: commands.Context) -> None:
+        """
+        Déclencheurs par contenu, actifs dans tous les channels.
+
+        Un message contenant un mot-clé (mot entier, sans casse) ou
+        correspondant à une regex déclenche le honeypot.
+        """
+        pass
+
+    @honeypot_pattern.command(name="add")
+    async def honeypot_pattern_add(self, ctx: commands.Context, *, keyword: str) -> None:
+        """Ajouter un mot-clé ou une phrase (ex: free nitro)."""
+        keyword = " ".join(keyword.lower().split())
+        if len(keyword) > MAX_PATTERN_LENGTH:
+            await ctx.send(f"❌ {MAX_PATTERN_LENGTH} caractères maximum.")
+            return
+        async with self.config.guild(ctx.guild).keywords() as keywords:
+            if keyword in keywords:
+                await ctx.send("❌ Mot-clé déjà présent.")
+                return
+            keywords.append(keyword)
+        self.invalidate_guild(ctx.guild, patterns=True)
+        await ctx.send(f"✅ Mot-clé ajouté: `{keyword}`")
+
+    @honeypot_pattern.command(name="addregex")
+    async def honeypot_pattern_add_regex(self, ctx: commands.Context, *, regex: str) -> None:
+        """Ajouter une expression régulière."""
+        if len(regex) > MAX_PATTERN_LENGTH:
+            await ctx.send(f"❌ {MAX_PATTERN_LENGTH} caractères maximum.")
+            return
+        error = check_regex(regex)
+        if error:
+            await ctx.send(f"❌ {error}")
+            return
+        keywords = await self.config.guild(ctx.guild).keywords()
+        async with self.config.guild(ctx.guild).regexes() as regexes:
+            if regex in regexes:
+                await ctx.send("❌ Regex déjà présente.")
+                return
+            try:
+                compile_matcher(keywords, regexes + [regex])
+            except re.error as e:
+                await ctx.send(f"❌ Regex incompatible avec les motifs existants: {e}")
+                return
+            regexes.append(regex)
+        self.invalidate_guild(ctx.guild, patterns=True)
+        await ctx.send(f"✅ Regex ajoutée: `{regex}`")
+
+    @honeypot_pattern.command(name="remove")
+    async def honeypot_pattern_remove(self, ctx: commands.Context, *, pattern: str) -> None:
+        """Retirer un mot-clé ou une regex."""
+        keyword = " ".join(pattern.lower().split())
+        async with self.config.guild(ctx.guild).keywords() as keywords:
+            removed = keyword in keywords
+            if removed:
+                keywords.remove(keyword)
+        if not removed:
+            async with self.config.guild(ctx.guild).regexes() as regexes:
+                removed = pattern in regexes
+                if removed:
+                    regexes.remove(pattern)
+        if not removed:
+            await ctx.send("❌ Motif introuvable.")
+            return
+        self.invalidate_guild(ctx.guild, patterns=True)
+        await ctx.send("✅ Motif retiré.")
+
+    @honeypot_pattern.command(name="list")
+    async def honeypot_pattern_list(self, ctx: commands.Context) -> None:
+        """Lister les motifs du serveur."""
+        config = await self.get_guild_config(ctx.guild)
+        if not config["keywords"] and not config["regexes"]:
+            await ctx.send("❌ Aucun motif configuré.")
+            return
+        lines = [f"mot-clé  {keyword}" for keyword in config["keywords"]]
+        lines.extend(f"regex    {regex}" for regex in config["regexes"])
+        for page in pagify("\n".join(lines)):
+            await ctx.send(box(page))
+
+    @honeypot.command(name="cachestats")
+    async def honeypot_cache_stats(self, ctx: commands.Context) -> None:
+        """Afficher les statistiques du cache de cooldown."""
+        stats = self.action_cache.stats()
+        lines = [
+            f"Entrées      : {stats['size']} / {self.action_cache.maxsize}",
+            f"En cooldown  : {stats['hits']}",
+            f"Nouveaux     : {stats['misses']}",
+            f"Expirées     : {stats['expirations']}",
+            f"Évincées     : {stats['evictions']}",
+        ]
+        await ctx.send(box("\n".join(lines)))
+
+    @honeypot.command(name="queuestats")
+    async def honeypot_queue_stats(self, ctx: commands.Context) -> None:
+        """Afficher les statistiques de la file des DM et logs."""
+        stats = self.side_effects.stats()
+        lines = [
+            f"En attente   : {stats['pending']}",
+            f"Soumises     : {stats['submitted']}",
+            f"Terminées    : {stats['completed']}",
+            f"Réessais     : {stats['retried']}",
+            f"Échecs       : {stats['failed']}",
+            f"Abandonnées  : {stats['dropped']}",
+        ]
+        await ctx.send(box("\n".join(lines)))
+
     async def is_user_excluded(self, member: discord.Member) -> bool:
         """Vérifier si un utilisateur est exclu du système honeypot."""
-        config = await self.config.guild(member.guild).all()
-        
+        config = await self.get_guild_config(member.guild)
+        return self.check_excluded(member, config)
+
+    @staticmethod
+    def check_excluded(member: discord.Member, config: dict) -> bool:
+        """
+        Vérifier l'exclusion à partir de l'instantané du serveur, sans await.
+
+        Les IDs exclus sont des frozensets : chaque test est en temps
+        constant, quelle que soit la taille des listes d'exclusion.
+        """
         # Vérifier utilisateurs exclus
-        if member.id in config["excluded_users"]:
+        if member.id in config["excluded_user_ids"]:
+            return True
+        
+        # Chemin rapide : rôle le plus haut au-dessus du seuil configuré
+        threshold_id = config["exempt_above_role"]
+        if threshold_id:
+            threshold = member.guild.get_role(threshold_id)
+            if threshold and member.top_role > threshold:
+                return True
+        
+        # Chemin rapide : modérateurs
+        if config["exempt_managers"] and member.guild_permissions.manage_guild:
             return True
         
         # Vérifier rôles exclus
-        user_role_ids = [role.id for role in member.roles]
-        if any(role_id in config["excluded_roles"] for role_id in user_role_ids):
+        excluded_roles = config["excluded_role_ids"]
+        if excluded_roles and not excluded_roles.isdisjoint(role.id for role in member.roles):
             return True
         
         return False
 
     async def log_honeypot_trigger(self, member: discord.Member, channel: discord.TextChannel, message: discord.Message, action_taken: str) -> None:
         """Logger le déclenchement d'un honeypot."""
-        config = await self.config.guild(member.guild).all()
+        config = await self.get_guild_config(member.guild)
         log_channel_id = config["log_channel"]
         
         if not log_channel_id:
@@ -263,12 +971,7 @@ class Honeypot(commands.Cog):
         if not log_channel:
             return
         
-        # Incrémenter le compteur
-        async with self.config.member(member).all() as member_data:
-            member_data["triggered_count"] += 1
-            member_data["last_trigger"] = message.created_at.timestamp()
-        
-        member_data = await self.config.member(member).all()
+        member_data = await self.get_member_triggers(member.guild.id, member.id)
         
         embed = discord.Embed(
             title="🍯 Honeypot Déclenché",
@@ -291,12 +994,93 @@ class Honeypot(commands.Cog):
         
         try:
             await log_channel.send(embed=embed)
-        except discord.HTTPException:
+        except discord.Forbidden:
             log.error(f"Impossible d'envoyer le log dans {log_channel_id}")
 
+    def record_trigger(self, member: discord.Member, message: discord.Message, action_taken: str, config: dict) -> None:
+        """
+        Compter un déclenchement en mémoire (écrit par lots via flush_triggers).
+
+        `config` est celle de l'appelant : le cache peut avoir été invalidé
+        pendant la suppression et l'action.
+        """
+        if config["shared_index"]:
+            self.offenders.add(member.id, message.created_at.timestamp())
+
+        key = (member.guild.id, member.id)
+        pending = self.pending_triggers.get(key)
+        if pending is None:
+            pending = self.pending_triggers[key] = {"count": 0, "last_trigger": 0, "history": []}
+
+        timestamp = message.created_at.timestamp()
+        pending["count"] += 1
+        pending["last_trigger"] = max(pending["last_trigger"], timestamp)
+        pending["history"].append({"time": timestamp, "channel": message.channel.id, "action": action_taken})
+        del pending["history"][:-TRIGGER_HISTORY_SIZE]
+
+    async def get_member_triggers(self, guild_id: int, user_id: int) -> dict:
+        """Données d'un membre : config + déclenchements pas encore écrits."""
+        data = await self.config.member_from_ids(guild_id, user_id).all()
+        pending = self.pending_triggers.get((guild_id, user_id))
+        if pending:
+            data["triggered_count"] += pending["count"]
+            data["last_trigger"] = max(data["last_trigger"], pending["last_trigger"])
+            data["history"] = (data["history"] + pending["history"])[-TRIGGER_HISTORY_SIZE:]
+        return data
+
+    def restore_pending_trigger(self, key: Tuple[int, int], entry: dict) -> None:
+        """Remettre en mémoire des compteurs non écrits, avant les plus récents."""
+        current = self.pending_triggers.get(key)
+        if current is None:
+            self.pending_triggers[key] = entry
+            return
+        current["count"] += entry["count"]
+        current["last_trigger"] = max(current["last_trigger"], entry["last_trigger"])
+        current["history"] = (entry["history"] + current["history"])[-TRIGGER_HISTORY_SIZE:]
+
+    async def write_pending_triggers(self) -> None:
+        """
+        Écrire les compteurs accumulés, une écriture par membre.
+
+        Les compteurs dont l'écriture échoue ou est interrompue sont remis
+        en mémoire pour le prochain passage.
+        """
+        pending, self.pending_triggers = self.pending_triggers, {}
+        items = list(pending.items())
+        for index, ((guild_id, user_id), entry) in enumerate(items):
+            try:
+                async with self.config.member_from_ids(guild_id, user_id).all() as data:
+                    data["triggered_count"] += entry["count"]
+                    data["last_trigger"] = max(data["last_trigger"], entry["last_trigger"])
+                    data["history"] = (data["history"] + entry["history"])[-TRIGGER_HISTORY_SIZE:]
+            except asyncio.CancelledError:
+                for key, unwritten in items[index:]:
+                    self.restore_pending_trigger(key, unwritten)
+                raise
+            except Exception:
+                log.exception(f"Impossible d'écrire les compteurs de {user_id} sur {guild_id}")
+                self.restore_pending_trigger((guild_id, user_id), entry)
+
+    @tasks.loop(seconds=TRIGGER_FLUSH_INTERVAL)
+    async def flush_triggers(self) -> None:
+        """Écrire périodiquement les compteurs, l'index partagé et l'audit."""
+        await self.write_pending_data()
+
+    async def write_pending_data(self) -> None:
+        async with self.flush_lock:
+            await self.write_pending_triggers()
+            try:
+                await self.offenders.flush()
+            except sqlite3.Error:
+                log.exception("Impossible d'écrire l'index partagé")
+            try:
+                await self.audit.flush()
+            except OSError:
+                log.exception("Impossible d'écrire le journal d'audit")
+
     async def send_dm_to_user(self, member: discord.Member, guild: discord.Guild) -> None:
         """Envoyer un DM à l'utilisateur."""
-        config = await self.config.guild(guild).all()
+        config = await self.get_guild_config(guild)
         
         if not config["dm_user"]:
             return
@@ -308,7 +1092,7 @@ class Honeypot(commands.Cog):
         
         try:
             await member.send(dm_message)
-        except discord.HTTPException:
+        except discord.Forbidden:
             log.warning(f"Impossible d'envoyer un DM à {member} ({member.id})")
 
     async def execute_action(self, member: discord.Member, channel: discord.TextChannel, message: discord.Message, action: str) -> str:
@@ -323,7 +1107,7 @@ class Honeypot(commands.Cog):
                 return "Utilisateur expulsé"
             
             elif action == "mute":
-                mute_role_id = await self.config.guild(member.guild).mute_role()
+                mute_role_id = (await self.get_guild_config(member.guild))["mute_role"]
                 if not mute_role_id:
                     return "Rôle mute non configuré"
                 
@@ -344,57 +1128,327 @@ class Honeypot(commands.Cog):
             log.error(f"Erreur lors de l'exécution de l'action {action}: {e}")
             return f"Erreur lors de l'action: {str(e)}"
 
+    def register_trigger(self, guild_id: int, config: dict) -> bool:
+        """
+        Enregistrer un déclenchement et retourner True si le serveur est en raid.
+
+        Le mode raid reste actif tant que le seuil est dépassé sur la
+        fenêtre glissante, puis pendant une fenêtre supplémentaire.
+        """
+        threshold = config["raid_threshold"]
+        if not threshold:
+            return False
+
+        now = time.monotonic()
+        window = config["raid_window"]
+        triggers = self.raid_triggers[guild_id]
+        triggers.append(now)
+        while triggers and triggers[0] <= now - window:
+            triggers.popleft()
+
+        if len(triggers) >= threshold:
+            if self.raid_until.get(guild_id, 0) <= now:
+                log.warning(f"Mode raid activé sur {guild_id} ({len(triggers)} déclenchements en {window}s)")
+            self.raid_until[guild_id] = now + window
+            return True
+        return self.raid_until.get(guild_id, 0) > now
+
+    def queue_raid_offender(self, message: discord.Message) -> None:
+        """Ajouter un message à la file du raid, traitée par lots."""
+        queue = self.raid_queues.get(message.guild.id)
+        if queue is None:
+            queue = self.raid_queues[message.guild.id] = []
+            task = asyncio.create_task(self.process_raid_queue(message.guild))
+            self.raid_tasks.add(task)
+            task.add_done_callback(self.raid_task_done)
+        queue.append(message)
+
+    def raid_task_done(self, task: asyncio.Task) -> None:
+        self.raid_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            log.error("Erreur lors du traitement d'un lot de raid", exc_info=task.exception())
+
+    async def process_raid_queue(self, guild: discord.Guild) -> None:
+        """Traiter les contrevenants accumulés pendant RAID_BATCH_DELAY secondes."""
+        await asyncio.sleep(RAID_BATCH_DELAY)
+        messages = self.raid_queues.pop(guild.id, [])
+        if not messages:
+            return
+
+        config = await self.get_guild_config(guild)
+        try:
+            delete_time = 0.0
+            if config["auto_delete"]:
+                _, delete_time = await timed(self.bulk_delete(messages))
+            results, action_time = await timed(self.bulk_action(guild, messages, config["action"]))
+            for message in messages:
+                outcome = results.get(message.author.id, "")
+                self.record_trigger(message.author, message, outcome, config)
+                self.audit.record(
+                    time=time.time(),
+                    guild=guild.id,
+                    user=message.author.id,
+                    channel=message.channel.id,
+                    source="raid",
+                    action=config["action"],
+                    outcome=outcome,
+                    batch=len(messages),
+                    latency_ms={"delete": ms(delete_time), "action": ms(action_time)},
+                )
+            await self.log_raid_batch(guild, messages, results)
+        except Exception:
+            log.exception(f"Erreur lors du traitement du raid sur {guild.id}")
+
+    async def bulk_delete(self, messages: List[discord.Message]) -> None:
+        """Supprimer les messages par lots de 100, salon par salon."""
+        by_channel: Dict[int, List[discord.Message]] = defaultdict(list)
+        for message in messages:
+            by_channel[message.channel.id].append(message)
+
+        for channel_messages in by_channel.values():
+            channel = channel_messages[0].channel
+            for i in range(0, len(channel_messages), BULK_DELETE_LIMIT):
+                chunk = channel_messages[i:i + BULK_DELETE_LIMIT]
+                try:
+                    if len(chunk) > 1:
+                        await channel.delete_messages(chunk)
+                    else:
+                        await chunk[0].delete()
+                except discord.HTTPException:
+                    log.warning(f"Impossible de supprimer {len(chunk)} message(s) dans {channel.id}")
+
+    async def bulk_action(self, guild: discord.Guild, messages: List[discord.Message], action: str) -> Dict[int, str]:
+        """
+        Appliquer l'action à tous les contrevenants, retourner {user_id: résultat}.
+
+        Les bans utilisent l'endpoint de ban groupé quand il est disponible
+        (il exige aussi Gérer le serveur) ; sinon, ou s'il est refusé, les
+        actions tournent en parallèle avec RAID_CONCURRENCY au plus.
+        """
+        offenders: Dict[int, discord.Message] = {}
+        for message in messages:
+            offenders.setdefault(message.author.id, message)
+
+        results: Dict[int, str] = {}
+        pending = list(offenders.values())
+        if action == "ban" and hasattr(guild, "bulk_ban") and guild.me is not None \
+                and guild.me.guild_permissions.manage_guild:
+            remaining, pending = pending, []
+            for i in range(0, len(remaining), BULK_BAN_LIMIT):
+                chunk = [message.author for message in remaining[i:i + BULK_BAN_LIMIT]]
+                try:
+                    result = await guild.bulk_ban(chunk, reason="Honeypot déclenché (raid)", delete_message_seconds=0)
+                except discord.Forbidden:
+                    log.warning(f"Ban groupé refusé sur {guild.id}, bans un par un")
+                    pending = remaining[i:]
+                    break
+                except discord.HTTPException as e:
+                    log.error(f"Erreur lors du ban groupé: {e}")
+                    for user in chunk:
+                        results[user.id] = f"Erreur lors de l'action: {str(e)}"
+                    continue
+                for user in result.banned:
+                    results[user.id] = "Utilisateur banni"
+                for user in result.failed:
+                    results[user.id] = "Échec du ban"
+
+        semaphore = asyncio.Semaphore(RAID_CONCURRENCY)
+
+        async def run(message: discord.Message) -> None:
+            async with semaphore:
+                results[message.author.id] = await self.execute_action(
+                    message.author, message.channel, message, action
+                )
+
+        await asyncio.gather(*(run(message) for message in pending))
+        return results
+
+    async def log_raid_batch(self, guild: discord.Guild, messages: List[discord.Message], results: Dict[int, str]) -> None:
+        """Envoyer un seul embed de synthèse pour un lot du raid."""
+        config = await self.get_guild_config(guild)
+        log_channel = guild.get_channel(config["log_channel"]) if config["log_channel"] else None
+
+        log.info(f"Raid sur {guild.id} : lot de {len(results)} contrevenant(s) traité")
+        if not log_channel:
+            return
+
+        outcomes: Dict[str, int] = defaultdict(int)
+        for outcome in results.values():
+            outcomes[outcome] += 1
+
+        authors = {message.author.id: message.author for message in messages}
+        lines = [f"{authors[user_id]} ({user_id}) - {outcome}" for user_id, outcome in results.items()]
+
+        embed = discord.Embed(
+            title="🚨 Raid Honeypot",
+            description=f"{len(results)} utilisateur(s) traité(s), {len(messages)} message(s)",
+            color=discord.Color.dark_red(),
+        )
+        embed.add_field(
+            name="Résultats",
+            value="\n".join(f"{outcome}: {count}" for outcome, count in outcomes.items()) or "Aucun",
+            inline=False,
+        )
+        for i, page in enumerate(pagify("\n".join(lines), page_length=1000)):
+            if i >= 5:
+                embed.set_footer(text="Liste tronquée")
+                break
+            embed.add_field(name="Utilisateurs" if i == 0 else "\u200b", value=box(page), inline=False)
+
+        try:
+            await log_channel.send(embed=embed)
+        except discord.HTTPException:
+            log.error(f"Impossible d'envoyer le log dans {log_channel.id}")
+
     @commands.Cog.listener()
     async def on_message(self, message: discord.Message) -> None:
-        """Écouter les messages dans les channels honeypot."""
+        """Écouter les messages dans les channels honeypot et les motifs interdits."""
         # Ignorer les bots et les DMs
         if not message.guild or message.author.bot:
             return
         
-        # Vérifier si c'est un channel honeypot
-        honeypot_channels = await self.config.guild(message.guild).honeypot_channels()
-        if message.channel.id not in honeypot_channels:
-            return
+        # Vérifier si c'est un channel honeypot (sans await une fois le cache chaud)
+        config = self.guild_cache.get(message.guild.id)
+        if config is None:
+            config = await self.get_guild_config(message.guild)
+        source = "channel"
+        if message.channel.id not in config["channel_ids"]:
+            # Ailleurs, seuls les motifs du serveur déclenchent (une seule recherche)
+            matcher = config["matcher"]
+            if matcher is None or not message.content or not matcher.search(message.content):
+                return
+            source = "pattern"
+        
+        started = time.perf_counter()
         
         # Vérifier si l'utilisateur est exclu
-        if await self.is_user_excluded(message.author):
+        if self.check_excluded(message.author, config):
             return
         
         # Vérifier le cooldown
-        cache_key = f"{message.guild.id}_{message.author.id}"
-        import time
-        current_time = time.time()
-        cooldown = await self.config.guild(message.guild).cooldown()
-        
-        if cache_key in self.action_cache:
-            if current_time - self.action_cache[cache_key] < cooldown:
-                return
+        if self.action_cache.check(message.guild.id, message.author.id, config["cooldown"]):
+            return
         
-        self.action_cache[cache_key] = current_time
+        # En raid, les contrevenants sont traités par lots
+        if self.register_trigger(message.guild.id, config):
+            self.queue_raid_offender(message)
+            return
         
-        # Supprimer le message si configuré
-        auto_delete = await self.config.guild(message.guild).auto_delete()
-        if auto_delete:
-            try:
-                await message.delete()
-            except discord.HTTPException:
-                log.warning(f"Impossible de supprimer le message {message.id}")
+        checks_time = time.perf_counter() - started
         
-        # Exécuter l'action
-        action = await self.config.guild(message.guild).action()
-        action_result = await self.execute_action(message.author, message.channel, message, action)
+        # Supprimer le message et exécuter l'action en parallèle
+        action = config["action"]
+        delete_time = 0.0
+        if config["auto_delete"]:
+            (_, delete_time), (action_result, action_time) = await asyncio.gather(
+                timed(self.delete_message(message)),
+                timed(self.execute_action(message.author, message.channel, message, action)),
+            )
+        else:
+            action_result, action_time = await timed(
+                self.execute_action(message.author, message.channel, message, action)
+            )
         
-        # Envoyer DM à l'utilisateur
-        await self.send_dm_to_user(message.author, message.guild)
+        self.audit.record(
+            time=time.time(),
+            guild=message.guild.id,
+            user=message.author.id,
+            channel=message.channel.id,
+            source=source,
+            action=action,
+            outcome=action_result,
+            latency_ms={
+                "checks": ms(checks_time),
+                "delete": ms(delete_time),
+                "action": ms(action_time),
+                "total": ms(time.perf_counter() - started),
+            },
+        )
         
-        # Logger l'événement
-        await self.log_honeypot_trigger(message.author, message.channel, message, action_result)
+        # DM, compteur et log en arrière-plan
+        self.record_trigger(message.author, message, action_result, config)
+        self.side_effects.submit("dm", self.send_dm_to_user, message.author, message.guild)
+        self.side_effects.submit("log", self.log_honeypot_trigger, message.author, message.channel, message, action_result)
         
         log.info(f"Honeypot déclenché par {message.author} ({message.author.id}) dans {message.channel} - Action: {action_result}")
 
-    def cog_unload(self) -> None:
+    @commands.Cog.listener()
+    async def on_member_join(self, member: discord.Member) -> None:
+        """Agir avant le premier message d'un utilisateur de l'index partagé."""
+        if member.bot:
+            return
+
+        config = self.guild_cache.get(member.guild.id)
+        if config is None:
+            config = await self.get_guild_config(member.guild)
+        if not config["shared_index"]:
+            return
+
+        await self.offenders.load()
+        if member.id not in self.offenders:
+            return
+        if self.check_excluded(member, config):
+            return
+
+        action = config["shared_action"]
+        if action == "log":
+            action_result = "Signalé (index partagé)"
+        else:
+            action_result = await self.execute_action(member, None, None, action)
+        self.side_effects.submit("log", self.log_shared_index_hit, member, action_result)
+        log.info(f"Utilisateur de l'index partagé {member} ({member.id}) arrivé sur {member.guild.id} - Action: {action_result}")
+
+    async def log_shared_index_hit(self, member: discord.Member, action_taken: str) -> None:
+        """Logger l'arrivée d'un utilisateur listé dans l'index partagé."""
+        config = await self.get_guild_config(member.guild)
+        log_channel = member.guild.get_channel(config["log_channel"]) if config["log_channel"] else None
+        if not log_channel:
+            return
+
+        entry = await self.offenders.get(member.id)
+        embed = discord.Embed(
+            title="🍯 Utilisateur de l'index partagé",
+            color=discord.Color.orange(),
+        )
+        embed.add_field(name="Utilisateur", value=f"{member} ({member.id})", inline=True)
+        embed.add_field(name="Action", value=action_taken, inline=True)
+        if entry:
+            embed.add_field(name="Déclenchements (tous serveurs)", value=entry["count"], inline=True)
+            embed.add_field(name="Dernier", value=f"<t:{int(entry['last_seen'])}:R>", inline=True)
+
+        try:
+            await log_channel.send(embed=embed)
+        except discord.Forbidden:
+            log.error(f"Impossible d'envoyer le log dans {log_channel.id}")
+
+    async def delete_message(self, message: discord.Message) -> None:
+        """Supprimer le message déclencheur."""
+        try:
+            await message.delete()
+        except discord.HTTPException:
+            log.warning(f"Impossible de supprimer le message {message.id}")
+
+    @tasks.loop(seconds=COOLDOWN_SWEEP_INTERVAL)
+    async def sweep_cooldowns(self) -> None:
+        """Purger régulièrement les cooldowns expirés."""
+        self.action_cache.sweep()
+
+    async def cog_unload(self) -> None:
         """Nettoyage lors du déchargement du cog."""
+        self.sweep_cooldowns.cancel()
+        # Attendre la fin d'une écriture en cours avant d'arrêter la boucle,
+        # la dernière écriture est faite ci-dessous
+        async with self.flush_lock:
+            self.flush_triggers.cancel()
+        # Les lots de raid en attente sont traités avant de partir
+        if self.raid_tasks:
+            _, pending = await asyncio.wait(self.raid_tasks, timeout=RAID_BATCH_DELAY + SIDE_EFFECT_DRAIN_TIMEOUT)
+            for task in pending:
+                task.cancel()
+        await self.side_effects.drain()
+        await self.write_pending_data()
         self.action_cache.clear()
+        self.guild_cache.clear()
 
 
 def setup(bot: Red) -> None:
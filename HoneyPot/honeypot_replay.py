@@ -0,0 +1,445 @@
+"""
+Banc de rejeu hors ligne pour le cog Honeypot.
+
+Rejoue un flux de messages (synthétique ou enregistré en JSONL) dans
+`Honeypot.on_message` avec de faux objets discord.py et une fausse Config
+en mémoire, puis affiche le débit et les latences p50/p99. Aucune connexion
+à Discord n'est nécessaire ; la latence de l'API est simulée.
+
+Exemples :
+    python honeypot_replay.py --messages 20000 --raid 200
+    python honeypot_replay.py --input messages.jsonl --api-latency 0.08
+    python honeypot_replay.py --raid 200 --bulk-ban forbidden
+
+Format JSONL enregistré, une ligne par message :
+    {"channel": 1, "author": 42, "content": "free nitro", "delay": 0.01}
+"""
+import argparse
+import asyncio
+import copy
+import json
+import random
+import statistics
+import tempfile
+import time
+from collections import Counter, namedtuple
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+from unittest import mock
+
+import discord
+
+try:
+    from . import honeypot_cog
+except ImportError:
+    import honeypot_cog
+
+GUILD_ID = 1
+HONEYPOT_CHANNEL_ID = 100
+LOG_CHANNEL_ID = 200
+FIRST_CHANNEL_ID = 300
+
+BulkBanResult = namedtuple("BulkBanResult", "banned failed")
+
+
+# ───────────────────────────────
+# FAUSSE CONFIG
+# ───────────────────────────────
+class FakeValue:
+    """Valeur en mémoire, utilisable comme `await v()` ou `async with v() as x`."""
+
+    def __init__(self, store: dict, key: str) -> None:
+        self.store = store
+        self.key = key
+
+    def __call__(self) -> "FakeValue":
+        return self
+
+    def __await__(self):
+        async def get():
+            return copy.deepcopy(self.store[self.key])
+        return get().__await__()
+
+    async def __aenter__(self):
+        self._value = copy.deepcopy(self.store[self.key])
+        return self._value
+
+    async def __aexit__(self, *exc) -> None:
+        self.store[self.key] = self._value
+
+    async def set(self, value) -> None:
+        self.store[self.key] = copy.deepcopy(value)
+
+
+class FakeGroup:
+    def __init__(self, data: dict) -> None:
+        self._data = data
+
+    def __getattr__(self, key: str) -> FakeValue:
+        if key.startswith("_"):
+            raise AttributeError(key)
+        return FakeValue(self._data, key)
+
+    def all(self) -> FakeValue:
+        return _AllValue(self._data)
+
+
+class _AllValue(FakeValue):
+    """`group.all()` : lit ou modifie tout le groupe d'un coup."""
+
+    def __init__(self, data: dict) -> None:
+        self.data = data
+
+    def __await__(self):
+        async def get():
+            return copy.deepcopy(self.data)
+        return get().__await__()
+
+    async def __aenter__(self):
+        self._value = copy.deepcopy(self.data)
+        return self._value
+
+    async def __aexit__(self, *exc) -> None:
+        self.data.clear()
+        self.data.update(self._value)
+
+
+class FakeConfig:
+    """Sous-ensemble de `redbot.core.Config` utilisé par le cog, en mémoire."""
+
+    def __init__(self) -> None:
+        self.guild_defaults: dict = {}
+        self.member_defaults: dict = {}
+        self.guilds: Dict[int, dict] = {}
+        self.members: Dict[int, Dict[int, dict]] = {}
+        self.writes = 0
+
+    def register_guild(self, **defaults) -> None:
+        self.guild_defaults = defaults
+
+    def register_member(self, **defaults) -> None:
+        self.member_defaults = defaults
+
+    def guild_from_id(self, guild_id: int) -> FakeGroup:
+        data = self.guilds.setdefault(guild_id, copy.deepcopy(self.guild_defaults))
+        return FakeGroup(data)
+
+    def guild(self, guild) -> FakeGroup:
+        return self.guild_from_id(guild.id)
+
+    def member_from_ids(self, guild_id: int, user_id: int) -> FakeGroup:
+        members = self.members.setdefault(guild_id, {})
+        data = members.setdefault(user_id, copy.deepcopy(self.member_defaults))
+        self.writes += 1
+        return FakeGroup(data)
+
+    def member(self, member) -> FakeGroup:
+        return self.member_from_ids(member.guild.id, member.id)
+
+    async def all_members(self, guild) -> Dict[int, dict]:
+        return copy.deepcopy(self.members.get(guild.id, {}))
+
+
+# ───────────────────────────────
+# FAUX OBJETS DISCORD
+# ───────────────────────────────
+class FakeAPI:
+    """Simule la latence de l'API Discord et compte les appels."""
+
+    def __init__(self, latency: float, jitter: float) -> None:
+        self.latency = latency
+        self.jitter = jitter
+        self.calls: Counter = Counter()
+
+    async def call(self, endpoint: str) -> None:
+        self.calls[endpoint] += 1
+        delay = self.latency + random.uniform(0, self.jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class FakeRole:
+    def __init__(self, role_id: int, position: int) -> None:
+        self.id = role_id
+        self.position = position
+
+    def __lt__(self, other: "FakeRole") -> bool:
+        return self.position < other.position
+
+    def __gt__(self, other: "FakeRole") -> bool:
+        return self.position > other.position
+
+
+class FakePermissions:
+    def __init__(self, manage_guild: bool = False) -> None:
+        self.manage_guild = manage_guild
+
+
+class FakeChannel:
+    def __init__(self, api: FakeAPI, guild: "FakeGuild", channel_id: int) -> None:
+        self.api = api
+        self.guild = guild
+        self.id = channel_id
+        self.name = f"channel-{channel_id}"
+        self.mention = f"<#{channel_id}>"
+
+    def __str__(self) -> str:
+        return self.name
+
+    async def send(self, *args, **kwargs) -> None:
+        await self.api.call("channel.send")
+
+    async def delete_messages(self, messages) -> None:
+        await self.api.call("channel.delete_messages")
+
+
+class FakeMember:
+    def __init__(self, api: FakeAPI, guild: "FakeGuild", user_id: int) -> None:
+        self.api = api
+        self.guild = guild
+        self.id = user_id
+        self.bot = False
+        self.default_role = FakeRole(guild.id, 0)
+        self.roles = [self.default_role]
+        self.top_role = self.default_role
+        self.guild_permissions = FakePermissions()
+
+    def __str__(self) -> str:
+        return f"user#{self.id}"
+
+    async def ban(self, **kwargs) -> None:
+        await self.api.call("member.ban")
+
+    async def kick(self, **kwargs) -> None:
+        await self.api.call("member.kick")
+
+    async def add_roles(self, *roles, **kwargs) -> None:
+        await self.api.call("member.add_roles")
+
+    async def send(self, *args, **kwargs) -> None:
+        await self.api.call("member.send")
+
+
+class FakeGuild:
+    """
+    `bulk_ban` : "ok", "forbidden" (l'endpoint répond 403) ou
+    "no-manage-guild" (le bot n'a pas Gérer le serveur).
+    """
+
+    def __init__(self, api: FakeAPI, guild_id: int, bulk_ban: str = "ok") -> None:
+        self.api = api
+        self.id = guild_id
+        self.name = f"guild-{guild_id}"
+        self.channels: Dict[int, FakeChannel] = {}
+        self.members: Dict[int, FakeMember] = {}
+        self.bulk_ban_mode = bulk_ban
+        self.me = FakeMember(api, self, 0)
+        self.me.guild_permissions = FakePermissions(manage_guild=bulk_ban != "no-manage-guild")
+
+    def channel(self, channel_id: int) -> FakeChannel:
+        if channel_id not in self.channels:
+            self.channels[channel_id] = FakeChannel(self.api, self, channel_id)
+        return self.channels[channel_id]
+
+    def member(self, user_id: int) -> FakeMember:
+        if user_id not in self.members:
+            self.members[user_id] = FakeMember(self.api, self, user_id)
+        return self.members[user_id]
+
+    def get_channel(self, channel_id: int) -> Optional[FakeChannel]:
+        return self.channels.get(channel_id)
+
+    def get_member(self, user_id: int) -> Optional[FakeMember]:
+        return self.members.get(user_id)
+
+    def get_role(self, role_id: int) -> None:
+        return None
+
+    async def bulk_ban(self, users, **kwargs) -> BulkBanResult:
+        await self.api.call("guild.bulk_ban")
+        if self.bulk_ban_mode != "ok":
+            raise discord.Forbidden(mock.Mock(status=403, reason="Forbidden"), "Missing Permissions")
+        return BulkBanResult(banned=list(users), failed=[])
+
+
+class FakeMessage:
+    _ids = iter(range(1, 1 << 62))
+
+    def __init__(self, channel: FakeChannel, author: FakeMember, content: str) -> None:
+        self.id = next(self._ids)
+        self.guild = channel.guild
+        self.channel = channel
+        self.author = author
+        self.content = content
+        self.attachments: list = []
+        self.created_at = datetime.now(timezone.utc)
+
+    async def delete(self) -> None:
+        await self.channel.api.call("message.delete")
+
+
+class FakeBot:
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        return asyncio.get_running_loop()
+
+
+# ───────────────────────────────
+# FLUX DE MESSAGES
+# ───────────────────────────────
+def synthetic_stream(
+    messages: int,
+    users: int,
+    channels: int,
+    honeypot_ratio: float,
+    pattern_ratio: float,
+    raid: int,
+    rate: float,
+) -> Iterable[dict]:
+    """Trafic normal, quelques déclenchements, puis un raid de `raid` comptes."""
+    delay = 1 / rate if rate else 0
+    for _ in range(messages):
+        roll = random.random()
+        if roll < honeypot_ratio:
+            channel, content = HONEYPOT_CHANNEL_ID, "salut"
+        elif roll < honeypot_ratio + pattern_ratio:
+            channel, content = FIRST_CHANNEL_ID + random.randrange(channels), "free nitro ici"
+        else:
+            channel, content = FIRST_CHANNEL_ID + random.randrange(channels), "un message normal"
+        yield {"channel": channel, "author": 10_000 + random.randrange(users), "content": content, "delay": delay}
+
+    for i in range(raid):
+        yield {"channel": HONEYPOT_CHANNEL_ID, "author": 1_000_000 + i, "content": "spam", "delay": 0.005}
+
+
+def recorded_stream(path: Path) -> Iterable[dict]:
+    with path.open(encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    index = min(len(values) - 1, max(0, round(q * (len(values) - 1))))
+    return values[index]
+
+
+# ───────────────────────────────
+# REJEU
+# ───────────────────────────────
+async def replay(stream: Iterable[dict], args: argparse.Namespace) -> dict:
+    api = FakeAPI(args.api_latency, args.api_jitter)
+    guild = FakeGuild(api, GUILD_ID, args.bulk_ban)
+    guild.channel(HONEYPOT_CHANNEL_ID)
+    guild.channel(LOG_CHANNEL_ID)
+    fake_config = FakeConfig()
+
+    with tempfile.TemporaryDirectory() as data_dir, mock.patch.object(
+        honeypot_cog.Config, "get_conf", return_value=fake_config
+    ), mock.patch.object(honeypot_cog, "cog_data_path", return_value=Path(data_dir)):
+        cog = honeypot_cog.Honeypot(FakeBot())
+        settings = cog.config.guild(guild)
+        await settings.honeypot_channels.set([HONEYPOT_CHANNEL_ID])
+        await settings.log_channel.set(LOG_CHANNEL_ID)
+        await settings.action.set(args.action)
+        await settings.keywords.set(["free nitro", "discord gift", "steam gift"])
+
+        latencies: List[float] = []
+
+        async def dispatch(message: FakeMessage) -> None:
+            started = time.perf_counter()
+            await cog.on_message(message)
+            latencies.append(time.perf_counter() - started)
+
+        tasks = []
+        started = time.perf_counter()
+        for entry in stream:
+            message = FakeMessage(
+                guild.channel(entry["channel"]),
+                guild.member(entry["author"]),
+                entry.get("content", ""),
+            )
+            if args.sequential:
+                await dispatch(message)
+            else:
+                # discord.py lance chaque événement dans sa propre tâche
+                tasks.append(asyncio.create_task(dispatch(message)))
+            if entry.get("delay") and not args.no_delay:
+                await asyncio.sleep(entry["delay"])
+            else:
+                await asyncio.sleep(0)
+        await asyncio.gather(*tasks)
+        handlers_done = time.perf_counter() - started
+
+        # Laisse finir les lots de raid et la file des effets secondaires
+        while cog.raid_queues:
+            await asyncio.sleep(0.1)
+        await asyncio.sleep(honeypot_cog.RAID_BATCH_DELAY + 0.5)
+        await cog.side_effects.queue.join()
+        total = time.perf_counter() - started
+
+        queue_stats = cog.side_effects.stats()
+        cache_stats = cog.action_cache.stats()
+        await cog.cog_unload()
+        audit_lines = (Path(data_dir) / "audit.jsonl").read_text(encoding="utf-8").splitlines() \
+            if (Path(data_dir) / "audit.jsonl").exists() else []
+
+    return {
+        "messages": len(latencies),
+        "handlers_seconds": round(handlers_done, 3),
+        "total_seconds": round(total, 3),
+        "throughput_msg_s": round(len(latencies) / handlers_done, 1) if handlers_done else 0.0,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 0.50) * 1000, 3),
+            "p99": round(percentile(latencies, 0.99) * 1000, 3),
+            "max": round(max(latencies, default=0) * 1000, 3),
+            "mean": round(statistics.fmean(latencies) * 1000, 3) if latencies else 0.0,
+        },
+        "triggers_audited": len(audit_lines),
+        "outcomes": dict(Counter(json.loads(line)["outcome"] for line in audit_lines)),
+        "api_calls": dict(api.calls),
+        "side_effects": queue_stats,
+        "cooldowns": cache_stats,
+        "config_member_writes": fake_config.writes,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Rejeu hors ligne du cog Honeypot")
+    parser.add_argument("--input", type=Path, help="flux enregistré (JSONL)")
+    parser.add_argument("--messages", type=int, default=10_000)
+    parser.add_argument("--users", type=int, default=2_000)
+    parser.add_argument("--channels", type=int, default=20)
+    parser.add_argument("--honeypot-ratio", type=float, default=0.01)
+    parser.add_argument("--pattern-ratio", type=float, default=0.005)
+    parser.add_argument("--raid", type=int, default=200, help="comptes du raid final")
+    parser.add_argument("--rate", type=float, default=0, help="messages/s (0 = au plus vite)")
+    parser.add_argument("--action", default="ban", choices=["ban", "kick", "mute", "delete_only"])
+    parser.add_argument("--bulk-ban", default="ok", choices=["ok", "forbidden", "no-manage-guild"],
+                        help="comportement du ban groupé")
+    parser.add_argument("--api-latency", type=float, default=0.05, help="latence simulée (s)")
+    parser.add_argument("--api-jitter", type=float, default=0.02)
+    parser.add_argument("--sequential", action="store_true", help="un message à la fois")
+    parser.add_argument("--no-delay", action="store_true", help="ignorer les délais du flux")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    random.seed(args.seed)
+    if args.input:
+        stream = recorded_stream(args.input)
+    else:
+        stream = synthetic_stream(
+            args.messages, args.users, args.channels,
+            args.honeypot_ratio, args.pattern_ratio, args.raid, args.rate,
+        )
+
+    report = asyncio.run(replay(stream, args))
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
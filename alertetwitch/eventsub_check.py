@@ -0,0 +1,275 @@
+"""
+Vérification hors ligne d'EventSub contre un faux Twitch local.
+
+Un serveur aiohttp joue le rôle de Twitch (token OAuth, /users et
+/eventsub/subscriptions) et envoie des notifications signées au serveur
+EventSub du cog. Sont vérifiés : la synchronisation des abonnements,
+le rythme du polling selon qu'elle a réussi ou non, la signature HMAC,
+le refus des messages trop anciens, l'anti-rejeu et la révocation.
+
+    python eventsub_check.py
+"""
+import asyncio
+import hashlib
+import hmac
+import json
+import logging
+import socket
+import sys
+import uuid
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+
+import aiohttp
+from aiohttp import web
+
+try:
+    from . import twitchalert
+except ImportError:
+    import twitchalert
+
+SECRET = "s3cret-de-test"
+CALLBACK = "https://example.invalid/eventsub"
+USERS = {"alice": "1001", "bob": "1002"}
+
+
+class FakeTwitch:
+    """Token OAuth, /users et /eventsub/subscriptions en mémoire"""
+
+    def __init__(self):
+        self.subscriptions = {}
+        self.fail_create = False
+        app = web.Application()
+        app.router.add_post("/oauth2/token", self.token)
+        app.router.add_get("/helix/users", self.users)
+        app.router.add_get("/helix/eventsub/subscriptions", self.list_subs)
+        app.router.add_post("/helix/eventsub/subscriptions", self.create_sub)
+        app.router.add_delete("/helix/eventsub/subscriptions", self.delete_sub)
+        self.runner = web.AppRunner(app)
+
+    async def start(self):
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        port = self.runner.addresses[0][1]
+        return f"http://127.0.0.1:{port}"
+
+    async def token(self, request):
+        return web.json_response({"access_token": "token", "expires_in": 3600})
+
+    async def users(self, request):
+        logins = request.query.getall("login", [])
+        data = [{"login": login, "id": USERS[login]} for login in logins if login in USERS]
+        return web.json_response({"data": data})
+
+    async def list_subs(self, request):
+        return web.json_response({"data": list(self.subscriptions.values()), "pagination": {}})
+
+    async def create_sub(self, request):
+        if self.fail_create:
+            return web.json_response({"message": "refusé"}, status=400)
+        payload = await request.json()
+        sub_id = str(uuid.uuid4())
+        self.subscriptions[sub_id] = {
+            "id": sub_id,
+            "status": "enabled",
+            "type": payload["type"],
+            "condition": payload["condition"],
+            "transport": {"method": "webhook", "callback": payload["transport"]["callback"]},
+        }
+        return web.json_response({"data": [self.subscriptions[sub_id]]}, status=202)
+
+    async def delete_sub(self, request):
+        self.subscriptions.pop(request.query["id"], None)
+        return web.Response(status=204)
+
+
+class FakeBot:
+    def __init__(self):
+        self.ready = asyncio.Event()
+
+    @property
+    def loop(self):
+        return asyncio.get_running_loop()
+
+    async def wait_until_ready(self):
+        await self.ready.wait()
+
+    def is_closed(self):
+        return False
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def signed_headers(body: bytes, message_type: str, message_id: str = None, sent: datetime = None, secret: str = SECRET):
+    message_id = message_id or str(uuid.uuid4())
+    sent = sent or datetime.now(timezone.utc)
+    timestamp = sent.strftime("%Y-%m-%dT%H:%M:%S.%f") + "123Z"
+    signature = "sha256=" + hmac.new(
+        secret.encode(), message_id.encode() + timestamp.encode() + body, hashlib.sha256
+    ).hexdigest()
+    return {
+        "Twitch-Eventsub-Message-Id": message_id,
+        "Twitch-Eventsub-Message-Timestamp": timestamp,
+        "Twitch-Eventsub-Message-Signature": signature,
+        "Twitch-Eventsub-Message-Type": message_type,
+        "Content-Type": "application/json",
+    }
+
+
+def notification(login: str, sub_type: str = "stream.online") -> bytes:
+    return json.dumps({
+        "subscription": {"type": sub_type, "status": "enabled"},
+        "event": {"broadcaster_user_login": login},
+    }).encode()
+
+
+class Checks:
+    def __init__(self):
+        self.failed = 0
+
+    def check(self, name: str, ok: bool, detail=""):
+        print(f"{'OK   ' if ok else 'ÉCHEC'} {name}" + (f" ({detail})" if detail and not ok else ""))
+        if not ok:
+            self.failed += 1
+
+
+async def run(checks: Checks):
+    twitch = FakeTwitch()
+    base = await twitch.start()
+    config = mock.MagicMock()
+    config.set_raw = mock.AsyncMock()
+    port = free_port()
+
+    with mock.patch.object(twitchalert.Config, "get_conf", return_value=config), \
+            mock.patch.object(twitchalert, "TWITCH_API", f"{base}/helix"), \
+            mock.patch.object(twitchalert, "TWITCH_TOKEN_URL", f"{base}/oauth2/token"):
+        cog = twitchalert.TwitchAlert(FakeBot())
+        settings = dict(config.register_global.call_args.kwargs)
+        settings.update(
+            twitch_client_id="client",
+            twitch_client_secret="secret",
+            eventsub_enabled=True,
+            eventsub_callback=CALLBACK,
+            eventsub_secret=SECRET,
+            eventsub_host="127.0.0.1",
+            eventsub_port=port,
+            streamers={login: {"is_live": False} for login in USERS},
+        )
+        cog.settings = settings
+        calls = []
+
+        async def set_live(login, is_live, stream=None):
+            calls.append((login, is_live))
+            if login == "boom":
+                raise RuntimeError("annonce impossible")
+
+        cog.set_live = set_live
+        refresh = settings["refresh"]
+
+        try:
+            # Synchronisation ratée : EventSub n'est pas actif, polling normal
+            await cog.start_eventsub()
+            twitch.fail_create = True
+            await cog.resync_eventsub()
+            checks.check("sync ratée -> EventSub inactif", not cog.eventsub_active)
+            checks.check(
+                "sync ratée -> polling normal",
+                cog.poll_interval({}, refresh, 0) == refresh,
+                cog.poll_interval({}, refresh, 0),
+            )
+            checks.check("sync ratée -> nouvel essai programmé", cog.eventsub_retry_at > 0)
+
+            # Synchronisation réussie
+            twitch.fail_create = False
+            created = await cog.sync_eventsub()
+            checks.check("sync réussie -> abonnements créés", created == 2 * len(USERS), created)
+            checks.check("sync réussie -> EventSub actif", cog.eventsub_active)
+            checks.check(
+                "sync réussie -> polling de rattrapage",
+                cog.poll_interval({}, refresh, 0) == max(refresh, twitchalert.EVENTSUB_RECONCILE),
+            )
+            checks.check("seconde sync idempotente", await cog.sync_eventsub() == 0)
+
+            url = f"http://127.0.0.1:{port}/eventsub"
+            async with aiohttp.ClientSession() as session:
+                async def post(body, headers):
+                    async with session.post(url, data=body, headers=headers) as resp:
+                        return resp.status, await resp.text()
+
+                body = json.dumps({"challenge": "abc123", "subscription": {}}).encode()
+                status, text = await post(body, signed_headers(body, "webhook_callback_verification"))
+                checks.check("challenge renvoyé", status == 200 and text == "abc123", (status, text))
+
+                body = notification("alice")
+                headers = signed_headers(body, "notification")
+                status, _ = await post(body, headers)
+                await asyncio.sleep(0.05)
+                checks.check("notification signée acceptée", status == 204 and calls == [("alice", True)], (status, calls))
+
+                status, _ = await post(body, headers)
+                await asyncio.sleep(0.05)
+                checks.check("rejeu ignoré", status == 204 and len(calls) == 1, (status, calls))
+
+                body = notification("bob")
+                status, _ = await post(body, signed_headers(body, "notification", secret="mauvais"))
+                checks.check("mauvaise signature refusée", status == 403, status)
+
+                headers = signed_headers(body, "notification")
+                headers["Twitch-Eventsub-Message-Signature"] = headers["Twitch-Eventsub-Message-Signature"][:-2] + "00"
+                status, _ = await post(body, headers)
+                checks.check("signature altérée refusée", status == 403, status)
+
+                tampered = notification("mallory")
+                status, _ = await post(tampered, signed_headers(body, "notification"))
+                checks.check("corps modifié refusé", status == 403, status)
+
+                old = datetime.now(timezone.utc) - timedelta(seconds=twitchalert.EVENTSUB_MAX_AGE + 60)
+                status, _ = await post(body, signed_headers(body, "notification", sent=old))
+                checks.check("message trop ancien refusé", status == 403, status)
+
+                status, _ = await post(body, {"Content-Type": "application/json"})
+                checks.check("en-têtes absents refusés", status == 403, status)
+                checks.check("aucune annonce pour les messages refusés", len(calls) == 1, calls)
+
+                body = notification("boom")
+                status, _ = await post(body, signed_headers(body, "notification"))
+                await asyncio.sleep(0.05)
+                checks.check(
+                    "annonce en échec journalisée, tâche libérée",
+                    status == 204 and not cog.background_tasks,
+                    cog.background_tasks,
+                )
+
+                # Révocation : polling normal jusqu'à la resynchronisation
+                revoked = next(iter(twitch.subscriptions))
+                twitch.subscriptions[revoked]["status"] = "authorization_revoked"
+                body = json.dumps({"subscription": twitch.subscriptions[revoked]}).encode()
+                status, _ = await post(body, signed_headers(body, "revocation"))
+                checks.check("révocation acceptée", status == 204, status)
+                await asyncio.sleep(0.2)
+                checks.check("révocation -> abonnement recréé", revoked not in twitch.subscriptions
+                             and len(twitch.subscriptions) == 2 * len(USERS))
+                checks.check("révocation -> EventSub de nouveau actif", cog.eventsub_active)
+
+            await cog.stop_eventsub()
+            checks.check("arrêt -> EventSub inactif", not cog.eventsub_active)
+        finally:
+            await cog.cog_unload()
+            await twitch.runner.cleanup()
+
+
+def main():
+    logging.basicConfig(level=logging.CRITICAL)
+    checks = Checks()
+    asyncio.run(run(checks))
+    print(f"\n{checks.failed} échec(s)")
+    sys.exit(1 if checks.failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,147 @@
 import aiohttp
 import asyncio
+import hashlib
+import hmac
+import json
+import logging
+import random
+import secrets
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from urllib.parse import urlparse
+
+from aiohttp import web
 
 from redbot.core import commands, Config
 from redbot.core.bot import Red
-from discord import TextChannel, AllowedMentions
+from redbot.core.utils.chat_formatting import pagify
+from discord import AllowedMentions, Color, Embed, TextChannel
+
+log = logging.getLogger("red.alertetwitch")
 
 TWITCH_API = "https://api.twitch.tv/helix"
 TWITCH_TOKEN_URL = "https://id.twitch.tv/oauth2/token"
 
+# Helix accepte jusqu'à 100 user_login par requête /streams
+STREAMS_BATCH_SIZE = 100
+
+HTTP_POOL_SIZE = 10
+HTTP_KEEPALIVE = 60
+HTTP_TIMEOUT = 15
+# Renouvelle le token un peu avant son expiration
+TOKEN_EXPIRY_MARGIN = 300
+
+EVENTSUB_TYPES = ("stream.online", "stream.offline")
+# Notifications plus vieilles que ça refusées (anti-rejeu, recommandation Twitch)
+EVENTSUB_MAX_AGE = 600
+EVENTSUB_SEEN_IDS = 1000
+# Avec EventSub actif, le polling ne sert plus qu'à rattraper un événement manqué
+EVENTSUB_RECONCILE = 900
+# Après une synchronisation ratée, nouvel essai au bout de ce délai
+EVENTSUB_RETRY = 300
+
+# Points gardés en réserve sur le seau Helix (partagé entre bots)
+RATELIMIT_RESERVE = 20
+MAX_RETRIES = 4
+BACKOFF_BASE = 2
+BACKOFF_MAX = 300
+# Hors des heures habituelles de live, un streamer est vérifié moins souvent
+COLD_FACTOR = 4
+COLD_MAX_INTERVAL = 600
+# Nombre minimal de lives enregistrés avant de se fier à l'historique
+MIN_LIVE_HISTORY = 3
+HOT_HOUR_SHARE = 0.25
+MIN_TICK = 5
+
+# Avatars et jaquettes changent rarement : une recherche par jour suffit
+METADATA_TTL = 86400
+METADATA_CACHE_SIZE = 2048
+TWITCH_PURPLE = 0x9146FF
+
+
+class TwitchAPIError(Exception):
+    """Erreur renvoyée par l'API Twitch"""
+
+    def __init__(self, message: str, status: int = None):
+        super().__init__(message)
+        self.status = status
+
+
+def backoff_delay(attempt: int):
+    """Backoff exponentiel avec jitter complet"""
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+
+class RateLimitBudget:
+    """Suit les en-têtes Ratelimit-* de Helix et espace les requêtes.
+
+    Le seau se remplit en continu jusqu'à Ratelimit-Reset : les points
+    restants (moins une réserve) sont répartis sur le temps qu'il reste.
+    """
+
+    def __init__(self):
+        self.limit = None
+        self.remaining = None
+        self.reset = 0.0
+        self.last_request = 0.0
+
+    def update(self, headers):
+        try:
+            self.limit = int(headers["Ratelimit-Limit"])
+            self.remaining = int(headers["Ratelimit-Remaining"])
+            self.reset = float(headers["Ratelimit-Reset"])
+        except (KeyError, ValueError):
+            pass
+
+    def reset_delay(self):
+        return max(0.0, self.reset - time.time())
+
+    def delay(self):
+        if self.remaining is None:
+            return 0.0
+
+        now = time.time()
+        if now >= self.reset:
+            return 0.0
+        if self.remaining <= RATELIMIT_RESERVE:
+            return self.reset_delay() + random.uniform(0, 1)
+
+        spacing = (self.reset - now) / (self.remaining - RATELIMIT_RESERVE)
+        return max(0.0, self.last_request + spacing - now)
+
+    async def wait(self):
+        delay = self.delay()
+        if delay:
+            await asyncio.sleep(delay)
+        self.last_request = time.time()
+
+
+class TTLCache:
+    """Cache LRU dont les entrées expirent après `ttl` secondes"""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.data = OrderedDict()
+
+    def get(self, key):
+        entry = self.data.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if time.time() >= expires_at:
+            del self.data[key]
+            return None
+        self.data.move_to_end(key)
+        return value
+
+    def set(self, key, value):
+        self.data[key] = (time.time() + self.ttl, value)
+        self.data.move_to_end(key)
+        while len(self.data) > self.maxsize:
+            self.data.popitem(last=False)
+
 
 class TwitchAlert(commands.Cog):
     """Annonce automatiquement quand un live Twitch démarre"""
@@ -19,19 +153,68 @@ class TwitchAlert(commands.Cog):
         self.config.register_global(
             twitch_channel=None,
             discord_channel=None,
+            streamers={},
             message="🔴 **{streamer} est en live !**\n👉 {url}",
             refresh=120,
             is_live=False,
             ping="off",
+            embed=True,
             twitch_client_id=None,
             twitch_client_secret=None,
             access_token=None,
+            token_expires_at=0,
+            eventsub_enabled=False,
+            eventsub_callback=None,
+            eventsub_secret=None,
+            eventsub_host="0.0.0.0",
+            eventsub_port=8080,
         )
 
+        # Copie en mémoire de la config globale, chargée une seule fois
+        self.settings = None
+        self.settings_lock = asyncio.Lock()
+        self.session = None
+        self.token_lock = asyncio.Lock()
+        self.eventsub_runner = None
+        # Vrai seulement après une synchronisation réussie des abonnements
+        self.eventsub_active = False
+        self.eventsub_retry_at = 0
+        self.eventsub_seen = OrderedDict()
+        self.background_tasks = set()
+        self.ratelimit = RateLimitBudget()
+        self.next_check = {}
+        self.users_cache = TTLCache(METADATA_CACHE_SIZE, METADATA_TTL)
+        self.games_cache = TTLCache(METADATA_CACHE_SIZE, METADATA_TTL)
         self.task = self.bot.loop.create_task(self.live_loop())
 
-    def cog_unload(self):
+    async def cog_unload(self):
         self.task.cancel()
+        for task in list(self.background_tasks):
+            task.cancel()
+        await self.stop_eventsub()
+        if self.session is not None:
+            await self.session.close()
+
+    # ───────────────────────────────
+    # ÉTAT EN MÉMOIRE
+    # ───────────────────────────────
+    async def get_settings(self):
+        """Config globale en mémoire : lue une fois, tenue à jour par les commandes"""
+        if self.settings is None:
+            async with self.settings_lock:
+                if self.settings is None:
+                    self.settings = await self.config.all()
+        return self.settings
+
+    async def update_setting(self, key: str, value):
+        settings = await self.get_settings()
+        await self.config.set_raw(key, value=value)
+        settings[key] = value
+
+    async def save_streamer(self, login: str):
+        """Écrit un seul streamer, uniquement quand son état a changé"""
+        settings = await self.get_settings()
+        await self.config.set_raw("streamers", login, value=settings["streamers"][login])
 
     # ───────────────────────────────
     # GROUPE DE COMMANDES
@@ -48,133 +231,662 @@ class TwitchAlert(commands.Cog):
     # ───────────────────────────────
     @alertetwitch.command()
     async def twitchid(self, ctx, client_id: str):
-        await self.config.twitch_client_id.set(client_id)
-        await self.config.access_token.clear()
+        await self.update_setting("twitch_client_id", client_id)
+        await self.update_setting("access_token", None)
+        await self.update_setting("token_expires_at", 0)
         await ctx.send("✅ **Client ID Twitch** enregistré")
 
     @alertetwitch.command()
     async def twitchsecret(self, ctx, secret: str):
-        await self.config.twitch_client_secret.set(secret)
-        await self.config.access_token.clear()
+        await self.update_setting("twitch_client_secret", secret)
+        await self.update_setting("access_token", None)
+        await self.update_setting("token_expires_at", 0)
         await ctx.send("✅ **Client Secret Twitch** enregistré")
 
     @alertetwitch.command()
     async def channel(self, ctx, streamer: str):
-        await self.config.twitch_channel.set(streamer.lower())
-        await self.config.is_live.set(False)
+        await self.add_streamer(streamer)
         await ctx.send(f"✅ Chaîne Twitch configurée : **{streamer}**")
 
+    # ───────────────────────────────
+    # STREAMERS SUIVIS
+    # ───────────────────────────────
+    @alertetwitch.command(name="add")
+    async def add(self, ctx, streamer: str, salon: TextChannel = None):
+        """Suit un streamer (salon d'annonce optionnel, sinon salon par défaut)"""
+        await self.add_streamer(streamer, salon.id if salon else None)
+        where = salon.mention if salon else "le salon par défaut"
+        await ctx.send(f"✅ **{streamer}** suivi, annonces dans {where}")
+
+    @alertetwitch.command(name="remove")
+    async def remove(self, ctx, streamer: str):
+        """Arrête de suivre un streamer"""
+        settings = await self.get_settings()
+        login = streamer.lower()
+        if settings["streamers"].pop(login, None) is None:
+            return await ctx.send(f"⛔ **{streamer}** n'est pas suivi")
+        await self.config.clear_raw("streamers", login)
+        await ctx.send(f"✅ **{streamer}** n'est plus suivi")
+        await self.resync_eventsub()
+
+    @alertetwitch.command(name="list")
+    async def list_streamers(self, ctx):
+        """Liste les streamers suivis"""
+        streamers = (await self.get_settings())["streamers"]
+        if not streamers:
+            return await ctx.send("Aucun streamer suivi")
+
+        lines = []
+        for login, data in sorted(streamers.items()):
+            channel_id = data.get("discord_channel")
+            where = f"<#{channel_id}>" if channel_id else "salon par défaut"
+            state = "🔴" if data.get("is_live") else "⚫"
+            lines.append(f"{state} **{login}** → {where}")
+
+        for page in pagify("\n".join(lines)):
+            await ctx.send(page)
+
+    async def add_streamer(self, streamer: str, channel_id: int = None):
+        settings = await self.get_settings()
+        login = streamer.lower()
+        settings["streamers"][login] = {
+            "discord_channel": channel_id,
+            "is_live": False,
+        }
+        await self.save_streamer(login)
+        self.next_check.pop(login, None)
+        await self.resync_eventsub()
+
     # ───────────────────────────────
     # CONFIGURATION DISCORD
     # ───────────────────────────────
     @alertetwitch.command()
     async def salon(self, ctx, channel: TextChannel):
-        await self.config.discord_channel.set(channel.id)
+        await self.update_setting("discord_channel", channel.id)
         await ctx.send(f"✅ Salon d'annonce défini : {channel.mention}")
 
     @alertetwitch.command()
     async def message(self, ctx, *, message: str):
-        await self.config.message.set(message)
+        """Variables : {streamer} {url} {title} {game} {viewers}"""
+        await self.update_setting("message", message)
         await ctx.send("✅ Message personnalisé enregistré")
 
     @alertetwitch.command()
     async def refresh(self, ctx, seconds: int):
         seconds = max(seconds, 30)
-        await self.config.refresh.set(seconds)
+        await self.update_setting("refresh", seconds)
         await ctx.send(f"✅ Vérification toutes les **{seconds} secondes**")
 
+    @alertetwitch.command()
+    async def embed(self, ctx, enabled: bool):
+        """Annonce enrichie (titre, jeu, spectateurs, miniature)"""
+        await self.update_setting("embed", enabled)
+        await ctx.send(f"✅ Embed d'annonce {'activé' if enabled else 'désactivé'}")
+
     @alertetwitch.command()
     async def ping(self, ctx, mode: str):
         if mode not in ("off", "everyone", "here"):
             return await ctx.send("⛔ Valeurs autorisées : off / everyone / here")
-        await self.config.ping.set(mode)
+        await self.update_setting("ping", mode)
         await ctx.send(f"✅ Ping configuré : **{mode}**")
 
+    # ───────────────────────────────
+    # EVENTSUB
+    # ───────────────────────────────
+    @alertetwitch.group()
+    async def eventsub(self, ctx):
+        """Réception instantanée des lives via EventSub (webhook)"""
+        if ctx.invoked_subcommand is None:
+            await ctx.send_help(ctx.command)
+
+    @eventsub.command(name="callback")
+    async def eventsub_callback(self, ctx, url: str):
+        """URL publique HTTPS qui redirige vers le serveur local"""
+        if not url.startswith("https://"):
+            return await ctx.send("⛔ Twitch exige une URL en **https://**")
+        await self.update_setting("eventsub_callback", url)
+        await ctx.send(f"✅ Callback EventSub : <{url}>")
+
+    @eventsub.command(name="port")
+    async def eventsub_port(self, ctx, port: int, host: str = "0.0.0.0"):
+        """Adresse d'écoute locale du serveur EventSub"""
+        await self.update_setting("eventsub_port", port)
+        await self.update_setting("eventsub_host", host)
+        await ctx.send(f"✅ Serveur EventSub : **{host}:{port}** (pris en compte au prochain `on`)")
+
+    @eventsub.command(name="on")
+    async def eventsub_on(self, ctx):
+        """Active EventSub (le polling reste en secours)"""
+        settings = await self.get_settings()
+        if not settings["eventsub_callback"]:
+            return await ctx.send("⛔ Configure d'abord le callback")
+        if not settings["eventsub_secret"]:
+            await self.update_setting("eventsub_secret", secrets.token_hex(32))
+
+        await self.update_setting("eventsub_enabled", True)
+        try:
+            await self.stop_eventsub()
+            await self.start_eventsub()
+            created = await self.sync_eventsub()
+        except (OSError, aiohttp.ClientError, TwitchAPIError) as e:
+            self.eventsub_retry_at = time.time() + EVENTSUB_RETRY
+            return await ctx.send(f"⛔ Erreur EventSub : {e} (le polling continue normalement)")
+        await ctx.send(f"✅ EventSub activé ({created} abonnement(s) créé(s))")
+
+    @eventsub.command(name="off")
+    async def eventsub_off(self, ctx):
+        """Désactive EventSub et revient au polling"""
+        await self.update_setting("eventsub_enabled", False)
+        await self.stop_eventsub()
+        try:
+            await self.sync_eventsub()
+        except (aiohttp.ClientError, TwitchAPIError) as e:
+            return await ctx.send(f"⚠️ EventSub désactivé, abonnements non supprimés : {e}")
+        await ctx.send("✅ EventSub désactivé, retour au polling")
+
+    async def start_eventsub(self):
+        if self.eventsub_runner is not None:
+            return
+
+        settings = await self.get_settings()
+        path = urlparse(settings["eventsub_callback"]).path or "/"
+
+        app = web.Application()
+        app.router.add_post(path, self.handle_eventsub)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(
+            runner,
+            settings["eventsub_host"],
+            settings["eventsub_port"],
+        )
+        try:
+            await site.start()
+        except OSError:
+            await runner.cleanup()
+            raise
+        self.eventsub_runner = runner
+
+    async def stop_eventsub(self):
+        self.eventsub_active = False
+        if self.eventsub_runner is not None:
+            await self.eventsub_runner.cleanup()
+            self.eventsub_runner = None
+
+    async def list_eventsub_subscriptions(self):
+        subs = []
+        params = {}
+        while True:
+            data = await self.api_get("eventsub/subscriptions", params)
+            subs.extend(data.get("data") or [])
+            cursor = (data.get("pagination") or {}).get("cursor")
+            if not cursor:
+                return subs
+            params = {"after": cursor}
+
+    async def sync_eventsub(self):
+        """Aligne les abonnements Twitch sur les streamers suivis.
+
+        Retourne le nombre d'abonnements créés. Tant que la synchronisation
+        n'a pas abouti, EventSub n'est pas considéré comme actif et le
+        polling garde son rythme normal.
+        """
+        self.eventsub_active = False
+        settings = await self.get_settings()
+        callback = settings["eventsub_callback"]
+        streamers = settings["streamers"]
+
+        wanted = {}
+        if settings["eventsub_enabled"] and callback and streamers:
+            ids = await self.get_user_ids(list(streamers))
+            for user_id in ids.values():
+                for sub_type in EVENTSUB_TYPES:
+                    wanted[(sub_type, user_id)] = True
+
+        existing = {}
+        for sub in await self.list_eventsub_subscriptions():
+            if sub.get("type") not in EVENTSUB_TYPES:
+                continue
+            # Le client ID peut être partagé : on ne touche qu'à nos abonnements
+            if sub.get("transport", {}).get("callback") != callback:
+                continue
+            key = (sub["type"], sub["condition"].get("broadcaster_user_id"))
+            if key in wanted and sub.get("status") == "enabled":
+                existing[key] = sub["id"]
+            else:
+                await self.api_request("DELETE", "eventsub/subscriptions", params={"id": sub["id"]})
+
+        secret = settings["eventsub_secret"]
+        created = 0
+        for sub_type, user_id in wanted:
+            if (sub_type, user_id) in existing:
+                continue
+            await self.api_request("POST", "eventsub/subscriptions", payload={
+                "type": sub_type,
+                "version": "1",
+                "condition": {"broadcaster_user_id": user_id},
+                "transport": {
+                    "method": "webhook",
+                    "callback": callback,
+                    "secret": secret,
+                },
+            })
+            created += 1
+
+        self.eventsub_active = self.eventsub_runner is not None and settings["eventsub_enabled"]
+        return created
+
+    async def resync_eventsub(self):
+        if self.eventsub_runner is None:
+            return
+        try:
+            await self.sync_eventsub()
+        except (aiohttp.ClientError, asyncio.TimeoutError, TwitchAPIError):
+            log.exception("Synchronisation EventSub impossible, polling normal en attendant")
+            self.eventsub_retry_at = time.time() + EVENTSUB_RETRY
+
+    def spawn(self, coro):
+        """Lance une tâche de fond gardée en référence, erreurs journalisées"""
+        task = asyncio.create_task(coro)
+        self.background_tasks.add(task)
+        task.add_done_callback(self.background_task_done)
+        return task
+
+    def background_task_done(self, task):
+        self.background_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            log.error("Erreur dans une tâche de fond", exc_info=task.exception())
+
+    @staticmethod
+    def verify_eventsub_signature(secret: str, message_id: str, timestamp: str, body: bytes, signature: str):
+        expected = "sha256=" + hmac.new(
+            secret.encode(),
+            message_id.encode() + timestamp.encode() + body,
+            hashlib.sha256,
+        ).hexdigest()
+        return hmac.compare_digest(expected, signature)
+
+    @staticmethod
+    def eventsub_message_age(timestamp: str):
+        # Format RFC3339 avec nanosecondes, seule la partie en secondes sert
+        try:
+            sent = datetime.strptime(timestamp[:19], "%Y-%m-%dT%H:%M:%S")
+        except ValueError:
+            return None
+        sent = sent.replace(tzinfo=timezone.utc)
+        return (datetime.now(timezone.utc) - sent).total_seconds()
+
+    async def handle_eventsub(self, request):
+        body = await request.read()
+        headers = request.headers
+        message_id = headers.get("Twitch-Eventsub-Message-Id", "")
+        timestamp = headers.get("Twitch-Eventsub-Message-Timestamp", "")
+        signature = headers.get("Twitch-Eventsub-Message-Signature", "")
+
+        secret = (await self.get_settings())["eventsub_secret"]
+        if not secret or not self.verify_eventsub_signature(
+            secret, message_id, timestamp, body, signature
+        ):
+            return web.Response(status=403)
+
+        age = self.eventsub_message_age(timestamp)
+        if age is None or age > EVENTSUB_MAX_AGE:
+            return web.Response(status=403)
+
+        # Twitch peut renvoyer plusieurs fois la même notification
+        if message_id in self.eventsub_seen:
+            return web.Response(status=204)
+        self.eventsub_seen[message_id] = True
+        if len(self.eventsub_seen) > EVENTSUB_SEEN_IDS:
+            self.eventsub_seen.popitem(last=False)
+
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            return web.Response(status=400)
+
+        message_type = headers.get("Twitch-Eventsub-Message-Type")
+        if message_type == "webhook_callback_verification":
+            return web.Response(text=payload.get("challenge", ""), content_type="text/plain")
+
+        if message_type == "revocation":
+            sub = payload.get("subscription", {})
+            log.warning("Abonnement EventSub révoqué : %s (%s)", sub.get("type"), sub.get("status"))
+            # Un streamer n'est plus couvert : polling normal jusqu'à la resynchronisation
+            self.eventsub_active = False
+            self.spawn(self.resync_eventsub())
+            return web.Response(status=204)
+
+        if message_type == "notification":
+            sub_type = payload.get("subscription", {}).get("type")
+            event = payload.get("event") or {}
+            login = (event.get("broadcaster_user_login") or "").lower()
+            if login and sub_type in EVENTSUB_TYPES:
+                # Réponse immédiate à Twitch, l'annonce part en tâche de fond
+                self.spawn(self.set_live(login, sub_type == "stream.online"))
+
+        return web.Response(status=204)
+
     # ───────────────────────────────
     # TWITCH API
     # ───────────────────────────────
+    async def get_session(self):
+        """Session HTTP unique pour toute la vie du cog (keep-alive)"""
+        if self.session is None or self.session.closed:
+            self.session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=HTTP_POOL_SIZE,
+                    keepalive_timeout=HTTP_KEEPALIVE,
+                ),
+                timeout=aiohttp.ClientTimeout(total=HTTP_TIMEOUT),
+            )
+        return self.session
+
     async def get_access_token(self):
-        client_id = await self.config.twitch_client_id()
-        secret = await self.config.twitch_client_secret()
+        settings = await self.get_settings()
+        client_id = settings["twitch_client_id"]
+        secret = settings["twitch_client_secret"]
 
         if not client_id or not secret:
             return None
 
-        async with aiohttp.ClientSession() as session:
-            async with session.post(
-                TWITCH_TOKEN_URL,
-                params={
-                    "client_id": client_id,
-                    "client_secret": secret,
-                    "grant_type": "client_credentials",
-                },
-            ) as resp:
-                data = await resp.json()
-                token = data.get("access_token")
-
-                if token:
-                    await self.config.access_token.set(token)
-                    return token
-        return None
-
-    async def api_headers(self):
-        token = await self.config.access_token()
+        session = await self.get_session()
+        async with session.post(
+            TWITCH_TOKEN_URL,
+            params={
+                "client_id": client_id,
+                "client_secret": secret,
+                "grant_type": "client_credentials",
+            },
+        ) as resp:
+            data = await resp.json()
+
+        token = data.get("access_token")
         if not token:
-            token = await self.get_access_token()
+            log.warning("Impossible d'obtenir un token Twitch : %s", data.get("message"))
+            return None
+
+        expires_at = time.time() + data.get("expires_in", 0)
+        await self.update_setting("access_token", token)
+        await self.update_setting("token_expires_at", expires_at)
+        return token
+
+    async def api_headers(self, refresh: bool = False):
+        settings = await self.get_settings()
+        token = settings["access_token"]
+        expires_at = settings["token_expires_at"]
+
+        if refresh or not token or time.time() >= expires_at - TOKEN_EXPIRY_MARGIN:
+            async with self.token_lock:
+                # Un autre appel a pu renouveler le token pendant l'attente
+                current = settings["access_token"]
+                if current and current != token:
+                    token = current
+                else:
+                    token = await self.get_access_token()
         if not token:
             return None
 
         return {
-            "Client-ID": await self.config.twitch_client_id(),
+            "Client-ID": settings["twitch_client_id"],
             "Authorization": f"Bearer {token}",
         }
 
-    async def is_stream_live(self, streamer: str):
+    async def api_request(self, method: str, path: str, params=None, payload=None):
+        """Requête sur l'API Helix.
+
+        Respecte le budget Ratelimit-*, renouvelle le token une fois sur 401
+        et réessaie avec backoff sur 429 et 5xx.
+        """
         headers = await self.api_headers()
         if not headers:
-            return False
-
-        async with aiohttp.ClientSession(headers=headers) as session:
-            async with session.get(
-                f"{TWITCH_API}/streams",
-                params={"user_login": streamer},
+            raise TwitchAPIError("Identifiants Twitch non configurés")
+
+        session = await self.get_session()
+        refreshed = False
+        for attempt in range(MAX_RETRIES):
+            await self.ratelimit.wait()
+            async with session.request(
+                method,
+                f"{TWITCH_API}/{path}",
+                params=params,
+                json=payload,
+                headers=headers,
             ) as resp:
-                data = await resp.json()
-                return bool(data.get("data"))
+                self.ratelimit.update(resp.headers)
+                status = resp.status
+                if status < 400:
+                    if status == 204:
+                        return {}
+                    return await resp.json()
+
+            if status == 401 and not refreshed:
+                refreshed = True
+                headers = await self.api_headers(refresh=True)
+                if not headers:
+                    raise TwitchAPIError("Token Twitch refusé", status)
+                continue
+            if status == 429:
+                delay = (self.ratelimit.reset_delay() or backoff_delay(attempt)) + random.uniform(0, 1)
+                log.warning("Limite Helix atteinte, pause de %.1fs", delay)
+                await asyncio.sleep(delay)
+                continue
+            if status >= 500:
+                await asyncio.sleep(backoff_delay(attempt))
+                continue
+            raise TwitchAPIError(f"Helix /{path} : HTTP {status}", status)
+
+        raise TwitchAPIError(f"Helix /{path} : HTTP {status} après {MAX_RETRIES} essais", status)
+
+    async def api_get(self, path: str, params):
+        return await self.api_request("GET", path, params=params)
+
+    async def get_user_ids(self, logins: list):
+        """Retourne {login: user_id}, par paquets de 100 logins"""
+        ids = {}
+        for i in range(0, len(logins), STREAMS_BATCH_SIZE):
+            chunk = logins[i:i + STREAMS_BATCH_SIZE]
+            data = await self.api_get("users", [("login", login) for login in chunk])
+            for user in data.get("data") or []:
+                ids[user["login"].lower()] = user["id"]
+        return ids
+
+    async def is_stream_live(self, streamer: str):
+        streams = await self.get_live_streams([streamer])
+        return streamer.lower() in streams
+
+    async def get_live_streams(self, streamers: list):
+        """Retourne {login: stream} pour les streamers en live.
+
+        Les logins sont envoyés par paquets de STREAMS_BATCH_SIZE :
+        une seule requête /streams couvre 100 streamers.
+        """
+        live = {}
+        for i in range(0, len(streamers), STREAMS_BATCH_SIZE):
+            chunk = streamers[i:i + STREAMS_BATCH_SIZE]
+            params = [("user_login", login) for login in chunk]
+            params.append(("first", str(STREAMS_BATCH_SIZE)))
+
+            data = await self.api_get("streams", params)
+            for stream in data.get("data") or []:
+                live[stream["user_login"].lower()] = stream
+        return live
+
+    async def get_cached(self, cache: TTLCache, path: str, ids: list):
+        """Retourne {id: objet} pour /users ou /games, via le cache.
+
+        Seuls les ids absents du cache sont demandés, par paquets de 100.
+        """
+        found = {}
+        missing = []
+        for item_id in ids:
+            item = cache.get(item_id)
+            if item is None:
+                missing.append(item_id)
+            else:
+                found[item_id] = item
+
+        for i in range(0, len(missing), STREAMS_BATCH_SIZE):
+            chunk = missing[i:i + STREAMS_BATCH_SIZE]
+            data = await self.api_get(path, [("id", item_id) for item_id in chunk])
+            for item in data.get("data") or []:
+                cache.set(item["id"], item)
+                found[item["id"]] = item
+        return found
+
+    async def get_user(self, user_id: str):
+        if not user_id:
+            return None
+        return (await self.get_cached(self.users_cache, "users", [user_id])).get(user_id)
+
+    async def get_game(self, game_id: str):
+        if not game_id:
+            return None
+        return (await self.get_cached(self.games_cache, "games", [game_id])).get(game_id)
 
     # ───────────────────────────────
     # BOUCLE LIVE
     # ───────────────────────────────
+    async def migrate_legacy_channel(self):
+        """Reprend l'ancien réglage mono-streamer dans le registre"""
+        settings = await self.get_settings()
+        streamer = settings["twitch_channel"]
+        if not streamer:
+            return
+
+        settings["streamers"].setdefault(streamer, {
+            "discord_channel": None,
+            "is_live": settings["is_live"],
+        })
+        await self.save_streamer(streamer)
+        await self.update_setting("twitch_channel", None)
+        await self.update_setting("is_live", False)
+
     async def live_loop(self):
         await self.bot.wait_until_ready()
+        await self.migrate_legacy_channel()
 
-        while not self.bot.is_closed():
-            streamer = await self.config.twitch_channel()
-            channel_id = await self.config.discord_channel()
-
-            if streamer and channel_id:
-                is_live = await self.is_stream_live(streamer)
-                was_live = await self.config.is_live()
+        if (await self.get_settings())["eventsub_enabled"]:
+            try:
+                await self.start_eventsub()
+            except OSError:
+                log.exception("Impossible de démarrer EventSub, polling seul")
+            await self.resync_eventsub()
 
-                if is_live and not was_live:
-                    await self.send_alert(streamer)
-                    await self.config.is_live.set(True)
+        failures = 0
+        while not self.bot.is_closed():
+            try:
+                delay = await self.check_streamers()
+                failures = 0
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                log.exception("Erreur lors de la vérification des lives")
+                failures += 1
+                delay = (await self.get_settings())["refresh"] + backoff_delay(failures)
+
+            # Synchronisation EventSub ratée : nouvel essai de temps en temps
+            if (
+                self.eventsub_runner is not None
+                and not self.eventsub_active
+                and time.time() >= self.eventsub_retry_at
+            ):
+                await self.resync_eventsub()
+
+            await asyncio.sleep(delay)
+
+    def poll_interval(self, data: dict, refresh: int, now: float):
+        """Intervalle avant la prochaine vérification d'un streamer"""
+        if self.eventsub_active:
+            return max(refresh, EVENTSUB_RECONCILE)
+        if data.get("is_live"):
+            return refresh
+
+        hours = data.get("live_hours") or []
+        if sum(hours) < MIN_LIVE_HISTORY:
+            return refresh
+
+        # Heure courante ou suivante parmi ses heures habituelles de live
+        hour = datetime.fromtimestamp(now, timezone.utc).hour
+        threshold = max(hours) * HOT_HOUR_SHARE
+        if hours[hour] >= threshold or hours[(hour + 1) % 24] >= threshold:
+            return refresh
+        return min(refresh * COLD_FACTOR, max(refresh, COLD_MAX_INTERVAL))
+
+    async def check_streamers(self):
+        """Vérifie les streamers dont le tour est venu.
+
+        Retourne le délai avant la prochaine échéance.
+        """
+        settings = await self.get_settings()
+        refresh = settings["refresh"]
+        streamers = settings["streamers"]
+        for login in list(self.next_check):
+            if login not in streamers:
+                del self.next_check[login]
+        if not streamers:
+            return refresh
+
+        now = time.time()
+        order = sorted(streamers, key=lambda login: self.next_check.get(login, 0))
+        due = [login for login in order if self.next_check.get(login, 0) <= now]
+
+        if due:
+            # Une requête coûte pareil pour 1 ou 100 logins : on complète
+            # le dernier paquet avec les streamers les plus proches de leur tour
+            missing = -len(due) % STREAMS_BATCH_SIZE
+            due.extend(order[len(due):len(due) + missing])
+
+            live = await self.get_live_streams(due)
+            now = time.time()
+            for login in due:
+                await self.set_live(login, login in live, live.get(login))
+                if login in streamers:
+                    self.next_check[login] = now + self.poll_interval(streamers[login], refresh, now)
+
+        next_due = min(self.next_check.values(), default=now + refresh)
+        return min(refresh, max(MIN_TICK, next_due - time.time()))
+
+    async def set_live(self, login: str, is_live: bool, stream: dict = None):
+        """Met à jour l'état d'un streamer et annonce un passage en live.
+
+        Partagé par le polling et EventSub : l'état en mémoire est vérifié
+        et modifié sans attente, une même mise en live n'est donc annoncée
+        qu'une fois. La config n'est écrite que lors d'un changement.
+        """
+        data = (await self.get_settings())["streamers"].get(login)
+        if data is None or data.get("is_live") == is_live:
+            return
+        data["is_live"] = is_live
+        channel_id = data.get("discord_channel")
 
-                if not is_live:
-                    await self.config.is_live.set(False)
+        if is_live:
+            hours = data.setdefault("live_hours", [0] * 24)
+            hours[datetime.now(timezone.utc).hour] += 1
 
-            await asyncio.sleep(await self.config.refresh())
+        await self.save_streamer(login)
+        if is_live:
+            await self.send_alert(login, channel_id, stream)
 
-    async def send_alert(self, streamer: str):
-        channel_id = await self.config.discord_channel()
+    async def send_alert(self, streamer: str, channel_id: int = None, stream: dict = None):
+        settings = await self.get_settings()
+        channel_id = channel_id or settings["discord_channel"]
         channel = self.bot.get_channel(channel_id)
         if not channel:
             return
 
-        message = await self.config.message()
+        # EventSub ne fournit pas le détail du stream : une seule requête /streams
+        if stream is None:
+            try:
+                stream = (await self.get_live_streams([streamer])).get(streamer)
+            except (aiohttp.ClientError, TwitchAPIError):
+                log.warning("Détails du live de %s indisponibles", streamer)
+        stream = stream or {}
+
+        message = settings["message"]
         url = f"https://twitch.tv/{streamer}"
 
-        ping = await self.config.ping()
+        ping = settings["ping"]
         prefix = ""
         if ping == "everyone":
             prefix = "@everyone "
@@ -182,12 +894,23 @@ class TwitchAlert(commands.Cog):
             prefix = "@here "
 
         content = prefix + message.format(
-            streamer=streamer,
+            streamer=stream.get("user_name") or streamer,
             url=url,
+            title=stream.get("title", ""),
+            game=stream.get("game_name", ""),
+            viewers=stream.get("viewer_count", 0),
         )
 
+        embed = None
+        if settings["embed"] and stream:
+            try:
+                embed = await self.build_embed(streamer, url, stream)
+            except (aiohttp.ClientError, TwitchAPIError):
+                log.warning("Métadonnées Twitch indisponibles pour %s", streamer)
+
         await channel.send(
             content,
+            embed=embed,
             allowed_mentions=AllowedMentions(
                 everyone=ping != "off",
                 roles=False,
@@ -195,6 +918,34 @@ class TwitchAlert(commands.Cog):
             ),
         )
 
+    async def build_embed(self, streamer: str, url: str, stream: dict):
+        user = await self.get_user(stream.get("user_id"))
+        game = await self.get_game(stream.get("game_id"))
+
+        embed = Embed(
+            title=stream.get("title") or url,
+            url=url,
+            color=Color(TWITCH_PURPLE),
+        )
+        embed.set_author(
+            name=stream.get("user_name") or streamer,
+            url=url,
+            icon_url=user.get("profile_image_url") if user else None,
+        )
+        if stream.get("game_name"):
+            embed.add_field(name="Jeu", value=stream["game_name"], inline=True)
+        embed.add_field(name="Spectateurs", value=str(stream.get("viewer_count", 0)), inline=True)
+
+        if game and game.get("box_art_url"):
+            embed.set_thumbnail(
+                url=game["box_art_url"].replace("{width}", "144").replace("{height}", "192")
+            )
+        if stream.get("thumbnail_url"):
+            # Paramètre anti-cache : Discord garde sinon l'ancienne miniature
+            thumbnail = stream["thumbnail_url"].replace("{width}", "1280").replace("{height}", "720")
+            embed.set_image(url=f"{thumbnail}?t={int(time.time())}")
+        return embed
+
 
 def setup(bot: Red):
     bot.add_cog(TwitchAlert(bot))
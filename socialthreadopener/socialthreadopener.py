@@ -1,8 +1,13 @@
 import re
+import time
+import codecs
 import asyncio
 import aiohttp
 import json
-from typing import Optional
+from collections import OrderedDict, defaultdict, deque
+from html.parser import HTMLParser
+from typing import Callable, Dict, Optional, Set
+from urllib.parse import urlsplit
 import discord
 from redbot.core import commands, Config, checks
 from redbot.core.bot import Red
@@ -32,6 +37,428 @@ default_guild = {
     "allow_media": True,
 }
 
+YOUTUBE_OEMBED = "https://www.youtube.com/oembed"
+TIKTOK_OEMBED = "https://www.tiktok.com/oembed"
+IMGUR_OEMBED = "https://api.imgur.com/oembed.json"
+
+PLATFORM_NAMES = {
+    "youtube": "YouTube",
+    "tiktok": "TikTok",
+    "instagram": "Instagram",
+    "facebook": "Facebook",
+    "imgur": "Imgur",
+    "twitch": "Twitch",
+}
+
+# Session HTTP partagée par toutes les récupérations de titres
+HTTP_POOL_SIZE = 10
+HTTP_KEEPALIVE = 60
+OEMBED_TIMEOUT = 5
+SCRAPE_TIMEOUT = 10
+
+# Lecture des pages en streaming : taille des morceaux et plafond
+SCRAPE_CHUNK_SIZE = 16 * 1024
+SCRAPE_MAX_BYTES = 1024 * 1024
+
+# Par hôte : requêtes simultanées, attente d'une place, disjoncteur
+# (ouvert après HOST_FAILURE_THRESHOLD échecs consécutifs)
+HOST_CONCURRENCY = 2
+HOST_QUEUE_TIMEOUT = 5
+HOST_FAILURE_THRESHOLD = 3
+HOST_COOLDOWN = 300
+
+# Titres mis en cache par contenu
+TITLE_CACHE_SIZE = 1024
+TITLE_TTL = 6 * 3600
+
+# Renommage des threads : regroupement des titres puis limite de Discord
+# (2 modifications de nom par salon toutes les 10 minutes)
+RENAME_DEBOUNCE = 1.5
+RENAME_LIMIT = 2
+RENAME_PERIOD = 600
+
+BROWSER_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.5',
+    'DNT': '1',
+    'Upgrade-Insecure-Requests': '1',
+    'Sec-Fetch-Dest': 'document',
+    'Sec-Fetch-Mode': 'navigate',
+    'Sec-Fetch-Site': 'none'
+}
+
+# Domaine -> (plateforme, forme attendue du chemin). Les sous-domaines
+# (www., m., web., music.…) sont résolus par leur domaine parent.
+HOST_PLATFORMS = {
+    "youtube.com": ("youtube", re.compile(r'/(watch\?(?:[^#\s]*&)?v=|shorts/|live/|embed/|v/|clip/)([a-zA-Z0-9_-]+)')),
+    "youtu.be": ("youtube", re.compile(r'/()([a-zA-Z0-9_-]+)')),
+    "tiktok.com": ("tiktok", re.compile(r'/@[^/\s]+/video/\d+')),
+    "vm.tiktok.com": ("tiktok", re.compile(r'/[a-zA-Z0-9]+')),
+    "instagram.com": ("instagram", re.compile(r'/(?:p|reel|share|reels)/[a-zA-Z0-9_-]+')),
+    "facebook.com": ("facebook", re.compile(r'/[a-zA-Z0-9/?=%&-]+')),
+    "fb.watch": ("facebook", re.compile(r'/[a-zA-Z0-9/?=%&-]+')),
+    "imgur.com": ("imgur", re.compile(r'/(?:a/|gallery/|t/)?[a-zA-Z0-9]+')),
+    "twitch.tv": ("twitch", re.compile(r'/(?:videos/\d+|[a-zA-Z0-9_]+(?:/clip/[a-zA-Z0-9_-]+)?)')),
+    "clips.twitch.tv": ("twitch", re.compile(r'/[a-zA-Z0-9_-]+')),
+}
+
+# Caractères d'ouverture à retirer devant un lien sans schéma
+URL_LEADING_CHARS = "([<\"'*_|~`"
+
+# Un hôte accepté n'est fait que de ces caractères (ni identifiants, ni port)
+HOST_CHARS = re.compile(r'[a-z0-9.-]+')
+
+
+def extract_social_urls(content: str) -> dict:
+    """
+    Classe les liens d'un message par plateforme en un seul passage.
+
+    Le texte est découpé une fois ; seuls les mots contenant un point sont
+    examinés, leur hôte (puis ses domaines parents) est cherché dans
+    HOST_PLATFORMS et le chemin est validé par l'expression de la plateforme. Retourne {plateforme: [urls]}
+    dans l'ordre d'apparition, sans doublons.
+    """
+    found = {}
+    if "." not in content:
+        return found
+
+    for token in content.split():
+        if "." not in token:
+            continue
+        start = token.find("://")
+        if start != -1:
+            token = token[start + 3:]
+        else:
+            token = token.lstrip(URL_LEADING_CHARS)
+
+        # L'hôte tel que le verra le client HTTP : "x?.facebook.com/..."
+        # ou "a@facebook.com/..." ne désignent pas Facebook
+        try:
+            netloc = urlsplit("//" + token).netloc
+        except ValueError:
+            continue
+        hostname = netloc.lower()
+        if not HOST_CHARS.fullmatch(hostname):
+            continue
+        path = token[len(netloc):]
+        if not path.startswith("/"):
+            continue
+        host = hostname
+
+        # L'hôte puis ses domaines parents, jusqu'à un chemin reconnu
+        match = None
+        while "." in host:
+            rule = HOST_PLATFORMS.get(host)
+            if rule is not None:
+                platform, pattern = rule
+                match = pattern.match(path)
+                if match is not None:
+                    break
+            host = host.split(".", 1)[1]
+        if match is None:
+            continue
+
+        if platform == "youtube":
+            kind, video_id = match.groups()
+            if kind in ("clip/", "shorts/"):
+                url = f"https://www.youtube.com/{kind}{video_id}"
+            else:
+                url = f"https://www.youtube.com/watch?v={video_id}"
+        else:
+            url = f"https://{hostname}{match.group(0)}"
+
+        urls = found.setdefault(platform, [])
+        if url not in urls:
+            urls.append(url)
+
+    return found
+
+
+def platform_domain(platform: str, url: str) -> Optional[str]:
+    """
+    Domaine de HOST_PLATFORMS dont relève l'hôte de l'URL pour cette
+    plateforme (l'hôte lui-même ou un domaine parent), ou None
+    """
+    try:
+        host = urlsplit(url).hostname
+    except ValueError:
+        return None
+    while host and "." in host:
+        rule = HOST_PLATFORMS.get(host)
+        if rule is not None and rule[0] == platform:
+            return host
+        host = host.split(".", 1)[1]
+    return None
+
+
+def youtube_video_key(url: str) -> str:
+    """Clé de cache d'une URL YouTube canonique : l'ID (préfixé "clip/" pour les clips)"""
+    if "/clip/" in url:
+        return "clip/" + url.rsplit("/", 1)[-1]
+    if "watch?v=" in url:
+        return url.split("watch?v=", 1)[1]
+    return url.rsplit("/", 1)[-1]
+
+
+def youtube_oembed_url(url: str) -> str:
+    """oEmbed ne connaît pas toujours les URLs de shorts"""
+    if "/shorts/" in url:
+        return f"https://www.youtube.com/watch?v={url.rsplit('/', 1)[-1]}"
+    return url
+
+
+def title_cache_key(platform: str, url: str) -> str:
+    """Clé de cache d'un titre : l'ID pour YouTube, l'URL canonique sinon"""
+    if platform == "youtube":
+        return f"youtube:{youtube_video_key(url)}"
+    return f"{platform}:{url}"
+
+
+class HeadTitleParser(HTMLParser):
+    """
+    Parseur incrémental qui relève les titres de l'en-tête d'une page
+
+    `done` passe à True dès que og:title est trouvé ou que l'en-tête se
+    termine ; le reste de la page n'a pas besoin d'être lu.
+    """
+
+    META_KEYS = ("og:title", "title", "twitter:title")
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.titles = {}
+        self.done = False
+        self._in_title = False
+        self._title_parts = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "meta":
+            attrs = dict(attrs)
+            key = (attrs.get("property") or attrs.get("name") or "").lower()
+            content = (attrs.get("content") or "").strip()
+            if key in self.META_KEYS and content:
+                self.titles.setdefault(key, content)
+                if key == "og:title":
+                    self.done = True
+        elif tag == "title":
+            self._in_title = True
+        elif tag == "body":
+            self.done = True
+
+    def handle_endtag(self, tag):
+        if tag == "title" and self._in_title:
+            self._in_title = False
+            title = "".join(self._title_parts).strip()
+            if title:
+                self.titles.setdefault("<title>", title)
+        elif tag == "head":
+            self.done = True
+
+    def handle_data(self, data):
+        if self._in_title:
+            self._title_parts.append(data)
+
+    def best_title(self) -> Optional[str]:
+        for key in ("og:title", "title", "<title>", "twitter:title"):
+            if self.titles.get(key):
+                return self.titles[key]
+        return None
+
+
+async def read_page_title(response: aiohttp.ClientResponse, max_bytes: int = SCRAPE_MAX_BYTES) -> Optional[str]:
+    """
+    Lit la page par morceaux jusqu'au titre puis coupe la connexion
+
+    Retourne le meilleur titre de l'en-tête (og:title, meta title, <title>,
+    twitter:title), ou None.
+    """
+    try:
+        decoder = codecs.getincrementaldecoder(response.charset or "utf-8")(errors="replace")
+    except LookupError:
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    parser = HeadTitleParser()
+    received = 0
+    try:
+        async for chunk in response.content.iter_chunked(SCRAPE_CHUNK_SIZE):
+            received += len(chunk)
+            parser.feed(decoder.decode(chunk))
+            if parser.done or received >= max_bytes:
+                break
+    finally:
+        # La connexion n'est pas rendue au pool avec un corps à moitié lu
+        response.close()
+    return parser.best_title()
+
+
+def response_ok(response: aiohttp.ClientResponse) -> bool:
+    """
+    True si la réponse est exploitable
+
+    Les 429 et 5xx lèvent une erreur : ils comptent comme un échec de l'hôte.
+    """
+    if response.status == 429 or response.status >= 500:
+        raise aiohttp.ClientResponseError(
+            response.request_info, response.history, status=response.status
+        )
+    return response.status == 200
+
+
+class MetadataFetcher:
+    """
+    Source de titre pour une plateforme
+
+    `fetch` retourne le titre brut ou None, et lève aiohttp.ClientError ou
+    asyncio.TimeoutError quand l'hôte est en cause.
+    """
+
+    timeout = OEMBED_TIMEOUT
+
+    def host(self, url: str) -> Optional[str]:
+        """
+        Hôte contacté, clé des limites et du disjoncteur
+
+        None si l'URL ne doit pas être récupérée par cette source.
+        """
+        return urlsplit(url).hostname or None
+
+    async def fetch(self, session: aiohttp.ClientSession, url: str) -> Optional[str]:
+        raise NotImplementedError
+
+
+class OEmbedFetcher(MetadataFetcher):
+    """Titre via un endpoint oEmbed (quelques centaines d'octets de JSON)"""
+
+    def __init__(self, endpoint: str, rewrite: Optional[Callable[[str], str]] = None):
+        self.endpoint = endpoint
+        self.rewrite = rewrite
+
+    def host(self, url: str) -> str:
+        return urlsplit(self.endpoint).hostname or ""
+
+    async def fetch(self, session: aiohttp.ClientSession, url: str) -> Optional[str]:
+        if self.rewrite is not None:
+            url = self.rewrite(url)
+        async with session.get(
+            self.endpoint,
+            params={"url": url, "format": "json"},
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+        ) as response:
+            if not response_ok(response):
+                return None
+            try:
+                data = await response.json(content_type=None)
+            except ValueError:
+                return None
+        return data.get("title") if isinstance(data, dict) else None
+
+
+class OpenGraphFetcher(MetadataFetcher):
+    """
+    Titre lu dans l'en-tête de la page (og:title, <title>...)
+
+    Seules les pages d'un domaine de la plateforme sont récupérées ; la clé
+    des limites est ce domaine, jamais l'hôte écrit dans le message.
+    """
+
+    timeout = SCRAPE_TIMEOUT
+
+    def __init__(self, platform: str):
+        self.platform = platform
+
+    def host(self, url: str) -> Optional[str]:
+        return platform_domain(self.platform, url)
+
+    async def fetch(self, session: aiohttp.ClientSession, url: str) -> Optional[str]:
+        if self.host(url) is None:
+            return None
+        async with session.get(
+            url,
+            headers=BROWSER_HEADERS,
+            allow_redirects=True,
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+        ) as response:
+            if not response_ok(response):
+                return None
+            return await read_page_title(response)
+
+
+# Sources essayées dans l'ordre pour chaque plateforme. Instagram et
+# Facebook exigent un jeton pour oEmbed, Twitch n'en propose pas.
+METADATA_FETCHERS = {
+    "youtube": [OEmbedFetcher(YOUTUBE_OEMBED, rewrite=youtube_oembed_url), OpenGraphFetcher("youtube")],
+    "tiktok": [OEmbedFetcher(TIKTOK_OEMBED), OpenGraphFetcher("tiktok")],
+    "instagram": [OpenGraphFetcher("instagram")],
+    "facebook": [OpenGraphFetcher("facebook")],
+    "imgur": [OEmbedFetcher(IMGUR_OEMBED), OpenGraphFetcher("imgur")],
+    "twitch": [OpenGraphFetcher("twitch")],
+}
+
+
+class HostGuard:
+    """
+    Limite de requêtes simultanées et disjoncteur pour un hôte
+
+    Après `threshold` échecs consécutifs, l'hôte est ignoré pendant
+    `cooldown` secondes, puis une seule requête d'essai est autorisée.
+    """
+
+    def __init__(
+        self,
+        concurrency: int = HOST_CONCURRENCY,
+        threshold: int = HOST_FAILURE_THRESHOLD,
+        cooldown: float = HOST_COOLDOWN,
+    ):
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.open_until = 0.0
+        self.probing = False
+
+    def allow(self) -> bool:
+        if self.failures < self.threshold:
+            return True
+        if self.probing or time.monotonic() < self.open_until:
+            return False
+        self.probing = True
+        return True
+
+    def record_success(self):
+        self.failures = 0
+
+    def record_failure(self):
+        self.failures += 1
+        if self.failures >= self.threshold:
+            self.open_until = time.monotonic() + self.cooldown
+
+
+class TTLCache:
+    """Cache LRU dont les entrées expirent après `ttl` secondes"""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.data = OrderedDict()
+
+    def get(self, key):
+        entry = self.data.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if time.time() >= expires_at:
+            del self.data[key]
+            return None
+        self.data.move_to_end(key)
+        return value
+
+    def set(self, key, value):
+        self.data[key] = (time.time() + self.ttl, value)
+        self.data.move_to_end(key)
+        while len(self.data) > self.maxsize:
+            self.data.popitem(last=False)
+
+
 class SocialThreadOpener(commands.Cog):
     """
     Crée automatiquement des threads pour les liens YouTube, TikTok, Instagram, Facebook, Imgur, Twitch et les GIFs
@@ -47,37 +474,22 @@ class SocialThreadOpener(commands.Cog):
 
         self.config.register_guild(**default_guild)
 
-        # Expressions régulières améliorées
-        self.url_patterns = {
-            "youtube": re.compile(
-                r'(?:https?://)?(?:www\.)?(youtube\.com/(?:watch\?v=|shorts/|live/|embed/|v/|clip/)|youtu\.be/)([a-zA-Z0-9_-]+)',
-                re.IGNORECASE
-            ),
-            "tiktok": re.compile(
-                r'(?:https?://)?(?:www\.)?(tiktok\.com/@[^/\s]+/video/\d+|vm\.tiktok\.com/[a-zA-Z0-9]+)',
-                re.IGNORECASE
-            ),
-            "instagram": re.compile(
-                r'(?:https?://)?(?:www\.)?(instagram\.com/(?:p|reel|share|reels)/[a-zA-Z0-9_-]+)',
-                re.IGNORECASE
-            ),
-            "facebook": re.compile(
-                r'(?:https?://)?(?:www\.)?(facebook\.com|fb\.watch)/[a-zA-Z0-9\/?=%&-]+',
-                re.IGNORECASE
-            ),
-            "imgur": re.compile(
-                r'(?:https?://)?(?:www\.)?(i\.)?imgur\.com/(?:a/|gallery/|t/)?[a-zA-Z0-9]+',
-                re.IGNORECASE
-            ),
-            "twitch": re.compile(
-                r'(?:https?://)?(?:www\.)?(twitch\.tv/(?:videos/\d+|[a-zA-Z0-9_]+(?:/clip/[a-zA-Z0-9_-]+)?)|clips\.twitch\.tv/[a-zA-Z0-9_-]+)',
-                re.IGNORECASE
-            )
-        }
-
         # Extensions de fichiers vidéo et GIF
-        self.gif_extensions = {'.gif', '.gifv'}
-        self.video_extensions = {'.mp4', '.avi', '.mov', '.mkv', '.webm', '.flv', '.wmv', '.m4v', '.3gp'}
+        self.gif_extensions = ('.gif', '.gifv')
+        self.video_extensions = ('.mp4', '.avi', '.mov', '.mkv', '.webm', '.flv', '.wmv', '.m4v', '.3gp')
+
+        # Session HTTP ouverte au premier besoin, titres par contenu,
+        # limites et disjoncteurs par hôte contacté (domaine de plateforme pour les pages)
+        self.session: Optional[aiohttp.ClientSession] = None
+        self.title_cache = TTLCache(TITLE_CACHE_SIZE, TITLE_TTL)
+        self.title_fetches: Dict[str, asyncio.Future] = {}
+        self.host_guards: Dict[str, HostGuard] = {}
+
+        # Threads créés avec le nom de secours, renommés quand le titre arrive
+        self.title_tasks: Set[asyncio.Task] = set()
+        self.pending_renames: Dict[int, tuple] = {}
+        self.rename_tasks: Dict[int, asyncio.Task] = {}
+        self.rename_history: Dict[int, deque] = defaultdict(deque)
 
     @commands.group(name="socialthread", aliases=["st"])
     @commands.guild_only()
@@ -292,63 +704,31 @@ class SocialThreadOpener(commands.Cog):
 
     def _has_social_content(self, message: discord.Message, config: dict) -> bool:
         """Vérifie si le message contient du contenu social"""
-        for platform, pattern in self.url_patterns.items():
-            if config["platforms"].get(platform, True):
-                if pattern.search(message.content):
-                    return True
-
-        if config["platforms"].get("gif", True):
-            for attachment in message.attachments:
-                if any(attachment.filename.lower().endswith(ext) for ext in self.gif_extensions):
-                    return True
-                if any(attachment.filename.lower().endswith(ext) for ext in self.video_extensions):
-                    return True
-
-        return False
+        platforms, _ = self._detect_social_links(message, config)
+        return bool(platforms)
 
     def _detect_social_links(self, message: discord.Message, config: dict) -> tuple:
-        """Détecte les liens sociaux pour créer des threads"""
-        detected_platforms = []
-        detected_urls = {}
-
-        for platform, pattern in self.url_patterns.items():
-            if not config["platforms"].get(platform, True):
-                continue
-
-            matches = pattern.findall(message.content)
-            if matches:
-                detected_platforms.append(platform)
-
-                if platform == "youtube":
-                    full_match = pattern.search(message.content)
-                    if full_match:
-                        url_base = full_match.group(1)
-                        video_id = full_match.group(2)
-
-                        if "youtu.be/" in url_base:
-                            detected_urls[platform] = f"https://www.youtube.com/watch?v={video_id}"
-                        elif "clip/" in url_base:
-                            detected_urls[platform] = f"https://www.youtube.com/clip/{video_id}"
-                        elif "shorts/" in url_base:
-                            detected_urls[platform] = f"https://www.youtube.com/shorts/{video_id}"
-                        else:
-                            detected_urls[platform] = f"https://www.youtube.com/watch?v={video_id}"
-
-                elif platform in ["facebook", "imgur"]:
-                    full_match = pattern.search(message.content)
-                    if full_match:
-                        detected_urls[platform] = full_match.group(0)
+        """
+        Détecte les liens sociaux pour créer des threads
+
+        Retourne la liste des plateformes détectées et, pour chacune, la
+        liste de toutes ses URLs.
+        """
+        detected_urls = {
+            platform: urls
+            for platform, urls in extract_social_urls(message.content).items()
+            if config["platforms"].get(platform, True)
+        }
 
         if config["platforms"].get("gif", True):
             for attachment in message.attachments:
-                if any(attachment.filename.lower().endswith(ext) for ext in self.gif_extensions):
-                    detected_platforms.append("gif")
-                    detected_urls["gif"] = attachment.url
-                elif any(attachment.filename.lower().endswith(ext) for ext in self.video_extensions):
-                    detected_platforms.append("video")
-                    detected_urls["video"] = attachment.url
+                filename = attachment.filename.lower()
+                if filename.endswith(self.gif_extensions):
+                    detected_urls.setdefault("gif", []).append(attachment.url)
+                elif filename.endswith(self.video_extensions):
+                    detected_urls.setdefault("video", []).append(attachment.url)
 
-        return detected_platforms, detected_urls
+        return list(detected_urls), detected_urls
 
     async def _delete_and_warn(self, message: discord.Message, config: dict):
         """Supprime le message et envoie un avertissement"""
@@ -378,67 +758,85 @@ class SocialThreadOpener(commands.Cog):
         except Exception as e:
             print(f"💥 Erreur suppression: {e}")
 
-    async def _get_youtube_title(self, url: str) -> Optional[str]:
-        """Récupère le titre YouTube avec plusieurs méthodes de fallback"""
-        try:
-            print(f"🎬 Récupération titre YouTube: {url}")
-
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-                'Accept-Language': 'en-US,en;q=0.5',
-                'Accept-Encoding': 'gzip, deflate, br',
-                'DNT': '1',
-                'Connection': 'keep-alive',
-                'Upgrade-Insecure-Requests': '1',
-                'Sec-Fetch-Dest': 'document',
-                'Sec-Fetch-Mode': 'navigate',
-                'Sec-Fetch-Site': 'none'
-            }
-
-            timeout = aiohttp.ClientTimeout(total=20)
-            connector = aiohttp.TCPConnector(ssl=False)
-
-            async with aiohttp.ClientSession(timeout=timeout, headers=headers, connector=connector) as session:
-                async with session.get(url, allow_redirects=True) as response:
-                    print(f"📡 Status HTTP: {response.status}")
-
-                    if response.status != 200:
-                        return None
-
-                    try:
-                        html = await response.text(encoding='utf-8')
-                    except:
-                        html = await response.text(encoding='latin-1')
-
-                    patterns = [
-                        (r'<meta\s+property=["\']og:title["\']\s+content=["\']([^"\']*)["\']', "og:title"),
-                        (r'<meta\s+name=["\']title["\']\s+content=["\']([^"\']*)["\']', "meta title"),
-                        (r'"videoDetails":\s*{[^}]*"title":\s*"([^"]*)"', "videoDetails JSON"),
-                        (r'<title>([^<]+?)\s*(?:-\s*YouTube)?</title>', "page title"),
-                        (r'<meta\s+property="twitter:title"\s+content="([^"]*)"', "twitter:title"),
-                        (r'"title":{"runs":\[{"text":"([^"]*)"', "runs title"),
-                    ]
-
-                    for pattern, method_name in patterns:
-                        matches = re.findall(pattern, html, re.IGNORECASE | re.DOTALL)
-                        if matches:
-                            for match in matches:
-                                title = match.strip()
-                                if title and len(title) > 3:
-                                    cleaned_title = self._clean_youtube_title(title)
-                                    if len(cleaned_title) > 3:
-                                        print(f"✅ Titre trouvé via {method_name}: '{cleaned_title}'")
-                                        return cleaned_title
-
-                    return None
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """Session HTTP unique pour toute la vie du cog (keep-alive)"""
+        if self.session is None or self.session.closed:
+            self.session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=HTTP_POOL_SIZE,
+                    keepalive_timeout=HTTP_KEEPALIVE,
+                ),
+            )
+        return self.session
+
+    async def _get_title(self, platform: str, url: str) -> Optional[str]:
+        """Récupère le titre d'un contenu, depuis le cache s'il a déjà été vu"""
+        key = title_cache_key(platform, url)
+        title = self.title_cache.get(key)
+        if title is not None:
+            return title
+
+        # Un contenu posté dans plusieurs canaux en même temps n'est récupéré qu'une fois
+        fetch = self.title_fetches.get(key)
+        if fetch is None:
+            fetch = asyncio.ensure_future(self._fetch_title(platform, url))
+            self.title_fetches[key] = fetch
+            fetch.add_done_callback(lambda _: self.title_fetches.pop(key, None))
+
+        title = await asyncio.shield(fetch)
+        if title:
+            self.title_cache.set(key, title)
+        return title
 
-        except Exception as e:
-            print(f"💥 Erreur récupération titre YouTube: {e}")
+    async def _fetch_title(self, platform: str, url: str) -> Optional[str]:
+        """Essaie les sources de la plateforme dans l'ordre"""
+        print(f"🎬 Récupération titre {PLATFORM_NAMES.get(platform, platform)}: {url}")
+        session = await self._get_session()
+        for fetcher in METADATA_FETCHERS.get(platform, ()):
+            title = await self._run_fetcher(fetcher, session, url)
+            if title:
+                cleaned_title = self._clean_title(title)
+                if len(cleaned_title) > 3:
+                    print(f"✅ Titre trouvé via {type(fetcher).__name__}: '{cleaned_title}'")
+                    return cleaned_title
+        return None
+
+    async def _run_fetcher(self, fetcher: MetadataFetcher, session: aiohttp.ClientSession, url: str) -> Optional[str]:
+        """Appelle une source en respectant la limite et le disjoncteur de son hôte"""
+        host = fetcher.host(url)
+        if host is None:
+            print(f"⛔ {url} ignoré (hôte hors de la plateforme)")
+            return None
+        guard = self.host_guards.get(host)
+        if guard is None:
+            guard = self.host_guards[host] = HostGuard()
+
+        # Un hôte lent ne garde que HOST_CONCURRENCY places, les autres attendent peu
+        try:
+            await asyncio.wait_for(guard.semaphore.acquire(), HOST_QUEUE_TIMEOUT)
+        except asyncio.TimeoutError:
+            print(f"⏳ Trop de requêtes en cours vers {host}")
             return None
 
-    def _clean_youtube_title(self, title: str) -> str:
-        """Nettoie spécifiquement les titres YouTube"""
+        try:
+            if not guard.allow():
+                print(f"⛔ {host} ignoré (disjoncteur ouvert)")
+                return None
+            try:
+                title = await fetcher.fetch(session, url)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                guard.record_failure()
+                print(f"⚠️ Échec {host}: {e!r}")
+                return None
+            finally:
+                guard.probing = False
+            guard.record_success()
+            return title
+        finally:
+            guard.semaphore.release()
+
+    def _clean_title(self, title: str) -> str:
+        """Nettoie les titres récupérés (entités HTML, suffixes YouTube, espaces)"""
         if not title:
             return ""
 
@@ -460,68 +858,94 @@ class SocialThreadOpener(commands.Cog):
 
         return title
 
+    def _format_thread_name(self, title: str, platform: str, author_name: str, config: dict) -> str:
+        """Nom de thread à partir d'un titre récupéré"""
+        max_length = config.get('max_title_length', 80)
+        if len(title) > max_length:
+            title = title[:max_length-3] + "..."
+
+        try:
+            return config["thread_name_format"].format(
+                title=title,
+                platform=platform,
+                author=author_name
+            )
+        except KeyError:
+            return title
+
+    def _fallback_thread_name(self, platforms: list, author_name: str) -> str:
+        """Nom de thread utilisé tant qu'aucun titre n'est connu"""
+        if len(platforms) != 1:
+            return f"Contenu de {author_name}"
+
+        platform = platforms[0]
+        if platform == "instagram":
+            return f"Post Instagram de {author_name}"
+        elif platform == "tiktok":
+            return f"Vidéo TikTok de {author_name}"
+        elif platform == "youtube":
+            return f"Vidéo YouTube de {author_name}"
+        elif platform == "facebook":
+            return f"Post Facebook de {author_name}"
+        elif platform == "imgur":
+            return f"Image Imgur de {author_name}"
+        elif platform == "gif":
+            return f"GIF de {author_name}"
+        elif platform == "twitch":
+            return f"Stream/Clip Twitch de {author_name}"
+        elif platform == "video":
+            return f"Vidéo de {author_name}"
+        return ""
+
+    def _clean_thread_name(self, thread_name: str, author_name: str) -> str:
+        """Retire les caractères interdits et respecte la limite de 100 caractères"""
+        thread_name = re.sub(r'[<>:"/\\|?*]', '', thread_name)
+        thread_name = re.sub(r'\s+', ' ', thread_name).strip()
+
+        if len(thread_name) > 100:
+            thread_name = thread_name[:97] + "..."
+
+        if len(thread_name) < 1:
+            thread_name = f"Thread de {author_name}"
+
+        return thread_name
+
     async def _create_thread_simplified(self, message: discord.Message, platforms: list, urls: dict, config: dict):
-        """Version simplifiée de création de thread"""
+        """Crée le thread tout de suite ; le titre est récupéré ensuite en arrière-plan"""
         try:
-            thread_name = ""
             author_name = message.author.display_name
 
             print(f"🧵 Création thread pour: {platforms}")
 
-            if "youtube" in platforms and config["fetch_titles"]:
-                url = urls.get("youtube")
-                if url:
-                    title = await self._get_youtube_title(url)
-                    if title and len(title.strip()) > 0:
-                        max_length = config.get('max_title_length', 80)
-                        if len(title) > max_length:
-                            title = title[:max_length-3] + "..."
-
-                        try:
-                            thread_name = config["thread_name_format"].format(
-                                title=title,
-                                platform="YouTube",
-                                author=author_name
-                            )
-                        except KeyError:
-                            thread_name = title
-
-            if not thread_name or len(thread_name.strip()) == 0:
-                if len(platforms) == 1:
-                    platform = platforms[0]
-                    if platform == "instagram":
-                        thread_name = f"Post Instagram de {author_name}"
-                    elif platform == "tiktok":
-                        thread_name = f"Vidéo TikTok de {author_name}"
-                    elif platform == "youtube":
-                        thread_name = f"Vidéo YouTube de {author_name}"
-                    elif platform == "facebook":
-                        thread_name = f"Post Facebook de {author_name}"
-                    elif platform == "imgur":
-                        thread_name = f"Image Imgur de {author_name}"
-                    elif platform == "gif":
-                        thread_name = f"GIF de {author_name}"
-                    elif platform == "twitch":
-                        thread_name = f"Stream/Clip Twitch de {author_name}"
-                    elif platform == "video":
-                        thread_name = f"Vidéo de {author_name}"
-                else:
-                    thread_name = f"Contenu de {author_name}"
-
-            thread_name = re.sub(r'[<>:"/\\|?*]', '', thread_name)
-            thread_name = re.sub(r'\s+', ' ', thread_name).strip()
-
-            if len(thread_name) > 100:
-                thread_name = thread_name[:97] + "..."
-
-            if len(thread_name) < 1:
-                thread_name = f"Thread de {author_name}"
+            # Premier contenu dont on sait récupérer le titre
+            title_platform = title_url = None
+            if config["fetch_titles"]:
+                for platform in platforms:
+                    if platform in METADATA_FETCHERS and urls.get(platform):
+                        title_platform, title_url = platform, urls[platform][0]
+                        break
+
+            # Titre déjà connu : pas besoin de renommer ensuite
+            title = self.title_cache.get(title_cache_key(title_platform, title_url)) if title_url else None
+            if title:
+                thread_name = self._format_thread_name(title, PLATFORM_NAMES[title_platform], author_name, config)
+                title_url = None
+            else:
+                thread_name = self._fallback_thread_name(platforms, author_name)
+            thread_name = self._clean_thread_name(thread_name, author_name)
 
             thread = await message.create_thread(
                 name=thread_name,
                 auto_archive_duration=1440
             )
 
+            if title_url:
+                task = asyncio.create_task(
+                    self._retitle_thread(thread, thread_name, title_platform, title_url, author_name, config)
+                )
+                self.title_tasks.add(task)
+                task.add_done_callback(self.title_tasks.discard)
+
             platform_list = ", ".join([p.title() for p in platforms])
             intro = f"Thread créé pour discuter du contenu {platform_list} partagé par {message.author.mention}!"
 
@@ -531,9 +955,71 @@ class SocialThreadOpener(commands.Cog):
         except Exception as e:
             print(f"💥 Erreur création thread: {e}")
 
-    def cog_unload(self):
+    async def _retitle_thread(
+        self, thread: discord.Thread, fallback_name: str, platform: str, url: str, author_name: str, config: dict
+    ):
+        """Récupère le titre du contenu puis demande le renommage du thread"""
+        title = await self._get_title(platform, url)
+        if not title or not title.strip():
+            return
+
+        name = self._clean_thread_name(
+            self._format_thread_name(title, PLATFORM_NAMES[platform], author_name, config), author_name
+        )
+        self._request_rename(thread, fallback_name, name)
+
+    def _request_rename(self, thread: discord.Thread, fallback_name: str, name: str):
+        """
+        Programme le renommage d'un thread
+
+        Les demandes rapprochées sont regroupées : seule la dernière est
+        appliquée après RENAME_DEBOUNCE secondes.
+        """
+        if name == fallback_name:
+            return
+        self.pending_renames[thread.id] = (thread, fallback_name, name)
+        if thread.id not in self.rename_tasks:
+            task = asyncio.create_task(self._rename_thread(thread.id))
+            self.rename_tasks[thread.id] = task
+            task.add_done_callback(lambda _: self.rename_tasks.pop(thread.id, None))
+
+    async def _rename_thread(self, thread_id: int):
+        """Applique le dernier nom demandé en respectant la limite de modification"""
+        await asyncio.sleep(RENAME_DEBOUNCE)
+
+        now = time.monotonic()
+        stale = [key for key, times in self.rename_history.items() if not times or now - times[-1] >= RENAME_PERIOD]
+        for key in stale:
+            del self.rename_history[key]
+
+        history = self.rename_history[thread_id]
+        while history and now - history[0] >= RENAME_PERIOD:
+            history.popleft()
+        if len(history) >= RENAME_LIMIT:
+            await asyncio.sleep(RENAME_PERIOD - (now - history[0]))
+
+        thread, fallback_name, name = self.pending_renames.pop(thread_id)
+
+        # Ne pas écraser un nom choisi à la main entre-temps
+        current = thread.guild.get_thread(thread_id) or thread
+        if current.name != fallback_name:
+            return
+
+        try:
+            await current.edit(name=name)
+            history.append(time.monotonic())
+            print(f"✏️ Thread renommé: '{name}'")
+        except discord.HTTPException as e:
+            print(f"⚠️ Impossible de renommer le thread: {e}")
+
+    async def cog_unload(self):
         """Nettoyage lors du déchargement du cog"""
-        pass
+        for task in list(self.title_tasks) + list(self.rename_tasks.values()):
+            task.cancel()
+        for fetch in list(self.title_fetches.values()):
+            fetch.cancel()
+        if self.session is not None:
+            await self.session.close()
 
 
 # Classe pour le bouton "Fermer" sur les messages d'avertissement
@@ -0,0 +1,161 @@
+"""
+Vérification de la lecture en streaming des titres contre un serveur local.
+
+Un serveur aiohttp sert des pages de plusieurs Mo, envoyées par morceaux,
+avec le titre en tête, sans titre, ou uniquement dans <title>. Pour chaque
+page, on vérifie le titre trouvé par `read_page_title` et le nombre
+d'octets réellement lus, qui doit rester très inférieur à la taille de
+la page.
+
+    python title_check.py --page-mb 8
+"""
+import argparse
+import asyncio
+import sys
+
+import aiohttp
+from aiohttp import web
+
+try:
+    from .socialthreadopener import SCRAPE_MAX_BYTES, OpenGraphFetcher, read_page_title
+except ImportError:
+    from socialthreadopener import SCRAPE_MAX_BYTES, OpenGraphFetcher, read_page_title
+
+FILLER = b"<div class='comment'>" + b"x" * 1000 + b"</div>\n"
+HEAD_SCRIPT = b"<script>var ytInitialData = {" + b"\"k\": 1, " * 4000 + b"};</script>\n"
+
+PAGES = {
+    # (en-tête, titre attendu)
+    "og": (
+        b"<html><head><meta charset='utf-8'><title>Titre secondaire - YouTube</title>"
+        + HEAD_SCRIPT
+        + "<meta property=\"og:title\" content=\"Vidéo &amp; test\">".encode()
+        + HEAD_SCRIPT
+        + b"</head><body>",
+        "Vidéo & test",
+    ),
+    "title": (
+        b"<html><head><title>Seulement le titre</title>" + HEAD_SCRIPT + b"</head><body>",
+        "Seulement le titre",
+    ),
+    "latin1": (
+        "<html><head><title>Été à Montréal</title></head><body>".encode("latin-1"),
+        "Été à Montréal",
+    ),
+    "none": (
+        b"<html><head>" + HEAD_SCRIPT + b"</head><body>",
+        None,
+    ),
+    # Pas de </head> ni de <body> : la lecture s'arrête au plafond
+    "unterminated": (
+        b"<html><head>" + FILLER * 10,
+        None,
+    ),
+}
+
+
+class PageServer:
+    """Sert chaque page par morceaux de 16 Ko, jusqu'à `page_bytes` octets"""
+
+    def __init__(self, page_bytes: int):
+        self.page_bytes = page_bytes
+        self.sent = {}
+        app = web.Application()
+        app.router.add_get("/{name}", self.page)
+        self.runner = web.AppRunner(app)
+
+    async def start(self) -> str:
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        return f"http://127.0.0.1:{self.runner.addresses[0][1]}"
+
+    async def page(self, request):
+        name = request.match_info["name"]
+        head, _ = PAGES[name]
+        charset = "iso-8859-1" if name == "latin1" else "utf-8"
+        response = web.StreamResponse(headers={"Content-Type": f"text/html; charset={charset}"})
+        await response.prepare(request)
+        self.sent[name] = 0
+        filler = FILLER if name != "unterminated" else b"<p>" + b"y" * 1000 + b"</p>\n"
+        try:
+            await response.write(head)
+            self.sent[name] += len(head)
+            while self.sent[name] < self.page_bytes:
+                chunk = filler * 16
+                await response.write(chunk)
+                self.sent[name] += len(chunk)
+                await asyncio.sleep(0)
+            await response.write_eof()
+        except (ConnectionResetError, asyncio.CancelledError):
+            pass
+        return response
+
+
+class CountingContent:
+    """Compte les octets remis au parseur"""
+
+    def __init__(self, content):
+        self.content = content
+        self.received = 0
+
+    async def iter_chunked(self, size):
+        async for chunk in self.content.iter_chunked(size):
+            self.received += len(chunk)
+            yield chunk
+
+
+class CountingResponse:
+    def __init__(self, response):
+        self.response = response
+        self.content = CountingContent(response.content)
+        self.charset = response.charset
+
+    def close(self):
+        self.response.close()
+
+
+async def run(args) -> int:
+    server = PageServer(args.page_mb * 1024 * 1024)
+    base = await server.start()
+    failed = 0
+    try:
+        async with aiohttp.ClientSession() as session:
+            for name, (_, expected) in PAGES.items():
+                async with session.get(f"{base}/{name}") as response:
+                    counted = CountingResponse(response)
+                    title = await read_page_title(counted)
+                    closed = response.closed
+                received = counted.content.received
+                limit = SCRAPE_MAX_BYTES + 64 * 1024 if expected is None else 256 * 1024
+                ok = title == expected and received <= limit and closed
+                failed += not ok
+                print(
+                    f"{'OK   ' if ok else 'ÉCHEC'} {name:<13} titre={title!r:<24} "
+                    f"lus={received / 1024:7.0f} Ko sur {args.page_mb * 1024} Ko, connexion fermée={closed}"
+                )
+
+            # Même chemin que le cog : la source OpenGraph ne contacte que
+            # les domaines de la plateforme, jamais le serveur local
+            before = dict(server.sent)
+            for url in (f"{base}/og", f"http://127.0.0.1:{base.rsplit(':', 1)[1]}?.twitch.tv/og"):
+                title = await OpenGraphFetcher("twitch").fetch(session, url)
+                ok = title is None and server.sent == before
+                failed += not ok
+                print(f"{'OK   ' if ok else 'ÉCHEC'} OpenGraphFetcher refuse {url!r}")
+    finally:
+        await server.runner.cleanup()
+
+    print(f"\n{failed} échec(s)")
+    return failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Lecture des titres en streaming")
+    parser.add_argument("--page-mb", type=int, default=8, help="taille des pages servies")
+    args = parser.parse_args()
+    sys.exit(1 if asyncio.run(run(args)) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,44 @@
+import asyncio
+import itertools
+import logging
 import re
+from collections import Counter, OrderedDict
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
 import discord
 from redbot.core import commands
 from redbot.core.bot import Red
 from redbot.core.config import Config
+from redbot.core.utils.chat_formatting import pagify
+
+log = logging.getLogger("red.studiosportaffiliate")
+
+# Marchand historique, construit à partir des réglages utm_* du serveur
+DEFAULT_MERCHANT = "studiosport.fr"
+
+# Ponctuation souvent collée à la fin d'un lien dans un message
+TRAILING_PUNCTUATION = ".,;:!?)]}>'\""
+
+# Nombre de liens réécrits gardés en mémoire
+REWRITE_CACHE_SIZE = 4096
+
+# Limites Discord : description d'embed et nombre d'embeds par message
+EMBED_DESCRIPTION_LIMIT = 4000
+MAX_EMBEDS = 10
+# Discord refuse un message dont les embeds dépassent 6000 caractères au total
+MESSAGE_EMBED_LIMIT = 6000
+MAX_COALESCE_WINDOW = 30
+
+# Statistiques : écriture groupée et taille maximale par catégorie
+STATS_FLUSH_INTERVAL = 300
+STATS_MAX_KEYS = 1000
+STATS_CATEGORIES = ("paths", "channels", "users")
+
 
 class StudiosportAffiliate(commands.Cog):
     """
-    COG pour transformer automatiquement les liens StudioSport en liens d'affiliation
+    COG pour transformer automatiquement les liens StudioSport (et des autres
+    marchands partenaires) en liens d'affiliation
     """
     
     def __init__(self, bot: Red):
@@ -19,21 +51,122 @@ class StudiosportAffiliate(commands.Cog):
             "utm_source": "bandolovers",
             "utm_medium": "affiliation", 
             "utm_campaign": "affi-bandolovers",
-            "message": "N'hésite pas à passer par notre lien partenaire StudioSport ! 🎯"
+            "message": "N'hésite pas à passer par notre lien partenaire StudioSport ! 🎯",
+            # domaine -> {"name", "params", "message"}
+            "merchants": {},
+            # Regroupe les liens postés dans un salon pendant N secondes (0 = désactivé)
+            "coalesce_window": 0,
+            # Compteurs de liens réécrits (mis à jour par lots)
+            "stats": {"total": 0, "paths": {}, "channels": {}, "users": {}}
         }
         
         self.config.register_guild(**default_guild)
         
-        # Pattern pour détecter les liens StudioSport
-        self.studiosport_pattern = re.compile(
-            r'https?://(?:www\.)?studiosport\.fr/[^\s]+',
-            re.IGNORECASE
-        )
+        # Pattern générique : un seul passage sur le message, quel que soit
+        # le nombre de marchands, le domaine est ensuite cherché dans un dict
+        self.url_pattern = re.compile(r'https?://[^\s<>]+', re.IGNORECASE)
+        
+        # Cache des réglages par serveur (invalidé par les commandes de config)
+        self.guild_cache = {}
+        
+        # Liens déjà réécrits, clé (version des réglages, URL)
+        self.rewrite_cache = OrderedDict()
+        self.settings_versions = itertools.count()
+        
+        # Liens en attente par salon pendant la fenêtre de regroupement
+        self.pending = {}
+        
+        # Compteurs pas encore écrits dans la config, par serveur
+        self.stats_delta = {}
+        self.stats_stopping = asyncio.Event()
+        self.stats_task = self.bot.loop.create_task(self.stats_loop())
+    
+    async def get_guild_settings(self, guild: discord.Guild) -> dict:
+        """
+        Retourne les réglages du serveur depuis le cache mémoire
+        """
+        settings = self.guild_cache.get(guild.id)
+        if settings is None:
+            settings = await self.config.guild(guild).all()
+            settings["rules"] = self.build_rules(settings)
+            # Chaque instantané a sa propre version : un changement de réglage
+            # rend caduques les réécritures en cache sans avoir à les purger
+            settings["version"] = next(self.settings_versions)
+            self.guild_cache[guild.id] = settings
+        return settings
+    
+    @staticmethod
+    def build_rules(settings: dict) -> dict:
+        """
+        Construit la table domaine -> règle du serveur
+        """
+        rules = {
+            DEFAULT_MERCHANT: {
+                "name": "StudioSport",
+                "params": (
+                    f"utm_source={settings['utm_source']}"
+                    f"&utm_medium={settings['utm_medium']}"
+                    f"&utm_campaign={settings['utm_campaign']}"
+                ),
+                "message": settings["message"],
+            }
+        }
+        for domain, rule in settings["merchants"].items():
+            rules[domain] = {
+                "name": rule.get("name") or domain,
+                "params": rule["params"],
+                "message": rule.get("message") or settings["message"],
+            }
+        for rule in rules.values():
+            rule["query"] = parse_qsl(rule["params"], keep_blank_values=True)
+        return rules
+    
+    @staticmethod
+    def match_merchant(rules: dict, url: str):
+        """
+        Retourne (domaine, règle) du marchand d'une URL, ou None
+        
+        Le nom d'hôte puis ses domaines parents sont cherchés dans la table :
+        le coût dépend du nombre de labels, pas du nombre de marchands.
+        """
+        try:
+            host = urlsplit(url).hostname
+        except ValueError:
+            return None
+        if not host:
+            return None
+        
+        while "." in host:
+            rule = rules.get(host)
+            if rule is not None:
+                return host, rule
+            host = host.split(".", 1)[1]
+        return None
+    
+    def find_merchant_links(self, content: str, rules: dict) -> list:
+        """
+        Trouve tous les liens marchands d'un message en un seul passage
+        
+        Retourne une liste de (url, domaine, règle).
+        """
+        links = []
+        for match in self.url_pattern.finditer(content):
+            url = match.group(0).rstrip(TRAILING_PUNCTUATION)
+            found = self.match_merchant(rules, url)
+            if found:
+                links.append((url, *found))
+        return links
+    
+    def invalidate_guild(self, guild: discord.Guild):
+        """
+        Oublie les réglages en cache après une modification
+        """
+        self.guild_cache.pop(guild.id, None)
     
     @commands.Cog.listener()
     async def on_message(self, message: discord.Message):
         """
-        Écoute tous les messages pour détecter les liens StudioSport
+        Écoute tous les messages pour détecter les liens des marchands partenaires
         """
         # Ignore les messages du bot
         if message.author.bot:
@@ -43,46 +176,237 @@ class StudiosportAffiliate(commands.Cog):
         if not message.guild:
             return
             
+        # Filtre rapide sans aucun await : la grande majorité des messages
+        # ne contient aucun lien et s'arrête ici
+        if "://" not in message.content:
+            return
+            
         # Vérifie si le COG est activé sur ce serveur
-        if not await self.config.guild(message.guild).enabled():
+        settings = await self.get_guild_settings(message.guild)
+        if not settings["enabled"]:
             return
             
-        # Cherche les liens StudiosPort dans le message
-        links = self.studiosport_pattern.findall(message.content)
-        
-        if links:
-            # Traite le premier lien trouvé
-            original_link = links[0]
-            affiliate_link = await self.add_utm_params(message.guild, original_link)
-            custom_message = await self.config.guild(message.guild).message()
+        # Cherche les liens marchands dans le message
+        links = self.find_merchant_links(message.content, settings["rules"])
+        
+        if not links:
+            return
             
-            # Envoie la réponse
-            embed = discord.Embed(
-                description=f"{custom_message}\n\n🔗 **Lien partenaire:**\n{affiliate_link}",
-                color=discord.Color.blue()
-            )
-            embed.set_footer(text="Lien d'affiliation StudioSport")
+        entries = [
+            (self.rewrite_link(settings, rule, url), rule)
+            for url, domain, rule in links
+        ]
+        self.record_links(message, links)
+        
+        window = settings["coalesce_window"]
+        if not window:
+            await self.send_links(message, entries)
+            return
             
+        # Regroupe les liens du salon et répond une seule fois à la fin de la fenêtre
+        pending = self.pending.get(message.channel.id)
+        if pending is None:
+            pending = {"message": message, "entries": []}
+            self.pending[message.channel.id] = pending
+            pending["task"] = asyncio.create_task(
+                self.flush_pending(message.channel.id, window)
+            )
+        pending["entries"].extend(entries)
+    
+    def get_delta(self, guild_id: int) -> dict:
+        """
+        Compteurs en mémoire d'un serveur, créés au besoin
+        """
+        delta = self.stats_delta.get(guild_id)
+        if delta is None:
+            delta = {"total": 0}
+            for category in STATS_CATEGORIES:
+                delta[category] = Counter()
+            self.stats_delta[guild_id] = delta
+        return delta
+    
+    def record_links(self, message: discord.Message, links: list):
+        """
+        Compte les liens réécrits en mémoire (aucune écriture ici)
+        """
+        delta = self.get_delta(message.guild.id)
+        for url, domain, rule in links:
+            delta["total"] += 1
+            delta["paths"][domain + (urlsplit(url).path or "/")] += 1
+            delta["channels"][str(message.channel.id)] += 1
+            delta["users"][str(message.author.id)] += 1
+    
+    async def stats_loop(self):
+        """
+        Écrit périodiquement les compteurs accumulés
+        """
+        while not self.stats_stopping.is_set():
+            try:
+                await asyncio.wait_for(self.stats_stopping.wait(), STATS_FLUSH_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            await self.flush_stats()
+    
+    async def flush_stats(self):
+        """
+        Ajoute les compteurs en mémoire à ceux de la config, un serveur à la fois
+        
+        Les compteurs d'un serveur dont l'écriture échoue sont remis en
+        mémoire pour le prochain passage ; les autres serveurs sont écrits.
+        """
+        deltas, self.stats_delta = self.stats_delta, {}
+        for guild_id, delta in deltas.items():
+            try:
+                value = self.config.guild_from_id(guild_id).stats
+                stats = await value()
+                stats["total"] += delta["total"]
+                for category in STATS_CATEGORIES:
+                    counts = Counter(stats[category])
+                    counts.update(delta[category])
+                    # Ne garde que les entrées les plus fréquentes
+                    stats[category] = dict(counts.most_common(STATS_MAX_KEYS))
+                await value.set(stats)
+            except Exception:
+                log.exception(f"Impossible d'écrire les statistiques du serveur {guild_id}")
+                pending = self.get_delta(guild_id)
+                pending["total"] += delta["total"]
+                for category in STATS_CATEGORIES:
+                    pending[category].update(delta[category])
+    
+    async def get_stats(self, guild: discord.Guild) -> dict:
+        """
+        Statistiques du serveur : config + compteurs pas encore écrits
+        """
+        stored = await self.config.guild(guild).stats()
+        delta = self.stats_delta.get(guild.id, {})
+        
+        stats = {"total": stored["total"] + delta.get("total", 0)}
+        for category in STATS_CATEGORIES:
+            counts = Counter(stored[category])
+            counts.update(delta.get(category, {}))
+            stats[category] = counts
+        return stats
+    
+    async def flush_pending(self, channel_id: int, delay: float = 0):
+        """
+        Envoie les liens regroupés d'un salon
+        """
+        if delay:
+            await asyncio.sleep(delay)
+        pending = self.pending.pop(channel_id, None)
+        if pending:
             try:
-                await message.reply(embed=embed, mention_author=False)
+                await self.send_links(pending["message"], pending["entries"])
+            except Exception:
+                log.exception(f"Impossible d'envoyer les liens regroupés du salon {channel_id}")
+    
+    def build_embeds(self, entries: list) -> list:
+        """
+        Construit les messages de réponse pour une liste de (lien, règle)
+        
+        Les doublons sont retirés et les liens répartis en embeds, puis en
+        messages de 10 embeds et 6000 caractères au plus. Retourne une liste
+        de listes d'embeds, une par message.
+        """
+        links = list(dict.fromkeys(link for link, rule in entries))
+        rules = list({rule["name"]: rule for link, rule in entries}.values())
+        
+        custom_message = rules[0]["message"]
+        header = "🔗 **Lien partenaire:**" if len(links) == 1 else "🔗 **Liens partenaires:**"
+        footer = ("Lien d'affiliation " + ", ".join(rule["name"] for rule in rules))[:2048]
+        limit = min(EMBED_DESCRIPTION_LIMIT, MESSAGE_EMBED_LIMIT - len(footer))
+        
+        # Remplit chaque embed puis chaque message, dans la limite de 6000
+        # caractères par message (pied de page compris)
+        batches = [[]]
+        used = len(footer)
+        current = f"{custom_message}\n\n{header}"[:limit]
+        for link in links:
+            line = f"\n{link}"
+            if len(current) + len(line) <= limit and used + len(current) + len(line) <= MESSAGE_EMBED_LIMIT:
+                current += line
+                continue
+            batches[-1].append(current)
+            used += len(current)
+            current = link
+            if len(batches[-1]) >= MAX_EMBEDS or used + len(current) > MESSAGE_EMBED_LIMIT:
+                batches.append([])
+                used = len(footer)
+        batches[-1].append(current)
+        
+        batches = [
+            [discord.Embed(description=chunk.strip(), color=discord.Color.blue()) for chunk in chunks]
+            for chunks in batches
+        ]
+        for embeds in batches:
+            embeds[-1].set_footer(text=footer)
+        return batches
+    
+    async def send_links(self, message: discord.Message, entries: list):
+        """
+        Répond avec tous les liens réécrits, en aussi peu de messages que possible
+        """
+        for index, embeds in enumerate(self.build_embeds(entries)):
+            try:
+                if index == 0:
+                    # Le message d'origine a pu disparaître pendant la fenêtre de regroupement
+                    await message.reply(embeds=embeds, mention_author=False, fail_if_not_exists=False)
+                else:
+                    await message.channel.send(embeds=embeds)
             except discord.HTTPException:
                 # Fallback si les embeds ne fonctionnent pas
-                await message.reply(f"{custom_message}\n{affiliate_link}", mention_author=False)
+                text = "\n".join(embed.description for embed in embeds)
+                try:
+                    for page in pagify(text):
+                        await message.channel.send(page)
+                except discord.HTTPException as e:
+                    log.warning(f"Impossible d'envoyer les liens dans {message.channel.id}: {e}")
+                    return
     
     async def add_utm_params(self, guild: discord.Guild, url: str) -> str:
         """
-        Ajoute les paramètres UTM au lien
+        Ajoute les paramètres d'affiliation du marchand au lien
+        """
+        settings = await self.get_guild_settings(guild)
+        found = self.match_merchant(settings["rules"], url)
+        if not found:
+            return url
+        return self.rewrite_link(settings, found[1], url)
+    
+    def rewrite_link(self, settings: dict, rule: dict, url: str) -> str:
+        """
+        Réécrit un lien avec mémorisation (les mêmes produits reviennent souvent)
         """
-        utm_source = await self.config.guild(guild).utm_source()
-        utm_medium = await self.config.guild(guild).utm_medium()
-        utm_campaign = await self.config.guild(guild).utm_campaign()
+        key = (settings["version"], url)
+        affiliate_link = self.rewrite_cache.get(key)
+        if affiliate_link is not None:
+            self.rewrite_cache.move_to_end(key)
+            return affiliate_link
         
-        # Vérifie si l'URL a déjà des paramètres
-        separator = "&" if "?" in url else "?"
+        affiliate_link = self.apply_rule(rule, url)
+        self.rewrite_cache[key] = affiliate_link
+        if len(self.rewrite_cache) > REWRITE_CACHE_SIZE:
+            self.rewrite_cache.popitem(last=False)
+        return affiliate_link
+    
+    @staticmethod
+    def apply_rule(rule: dict, url: str) -> str:
+        """
+        Ajoute les paramètres d'une règle marchand au lien
         
-        utm_params = f"utm_source={utm_source}&utm_medium={utm_medium}&utm_campaign={utm_campaign}"
+        Les paramètres déjà présents avec le même nom, ainsi que tout utm_*
+        existant, sont remplacés. Le fragment (#...) est conservé.
+        """
+        parts = urlsplit(url)
+        replaced = {name for name, _ in rule["query"]}
+        query = [
+            (name, value)
+            for name, value in parse_qsl(parts.query, keep_blank_values=True)
+            if name not in replaced and not name.startswith("utm_")
+        ]
+        query.extend(rule["query"])
         
-        return f"{url}{separator}{utm_params}"
+        return urlunsplit(parts._replace(query=urlencode(query)))
     
     @commands.group(name="studiosport", aliases=["sp"])
     @commands.admin_or_permissions(manage_guild=True)
@@ -99,6 +423,7 @@ class StudiosportAffiliate(commands.Cog):
         """
         current = await self.config.guild(ctx.guild).enabled()
         await self.config.guild(ctx.guild).enabled.set(not current)
+        self.invalidate_guild(ctx.guild)
         
         status = "activé" if not current else "désactivé"
         await ctx.send(f"✅ Le COG StudioSport a été **{status}** sur ce serveur.")
@@ -111,6 +436,7 @@ class StudiosportAffiliate(commands.Cog):
         Exemple: [p]studiosport message Profite de notre partenariat avec StudioSport !
         """
         await self.config.guild(ctx.guild).message.set(message)
+        self.invalidate_guild(ctx.guild)
         await ctx.send(f"✅ Message mis à jour : `{message}`")
     
     @studiosport_settings.command(name="utm")
@@ -123,24 +449,68 @@ class StudiosportAffiliate(commands.Cog):
         await self.config.guild(ctx.guild).utm_source.set(source)
         await self.config.guild(ctx.guild).utm_medium.set(medium)
         await self.config.guild(ctx.guild).utm_campaign.set(campaign)
+        self.invalidate_guild(ctx.guild)
         
         await ctx.send(f"✅ Paramètres UTM mis à jour :\n"
                       f"• Source: `{source}`\n"
                       f"• Medium: `{medium}`\n"
                       f"• Campaign: `{campaign}`")
     
+    @studiosport_settings.command(name="window", aliases=["fenetre"])
+    async def set_coalesce_window(self, ctx, seconds: int):
+        """
+        Regroupe les liens postés dans un salon pendant N secondes en une seule réponse
+        
+        0 pour répondre à chaque message. Exemple: [p]studiosport window 5
+        """
+        seconds = max(0, min(seconds, MAX_COALESCE_WINDOW))
+        await self.config.guild(ctx.guild).coalesce_window.set(seconds)
+        self.invalidate_guild(ctx.guild)
+        
+        if seconds:
+            await ctx.send(f"✅ Liens regroupés par salon sur **{seconds} secondes**.")
+        else:
+            await ctx.send("✅ Regroupement désactivé, une réponse par message.")
+    
+    @studiosport_settings.command(name="stats")
+    async def show_stats(self, ctx, top: int = 5):
+        """
+        Affiche les liens les plus partagés, par produit, salon et membre
+        
+        Exemple: [p]studiosport stats 10
+        """
+        top = max(1, min(top, 25))
+        stats = await self.get_stats(ctx.guild)
+        
+        embed = discord.Embed(
+            title="📈 Statistiques des liens partenaires",
+            description=f"**{stats['total']}** lien(s) réécrit(s)",
+            color=discord.Color.blue()
+        )
+        
+        products = [f"`{count}` {path}" for path, count in stats["paths"].most_common(top)]
+        channels = [f"`{count}` <#{channel_id}>" for channel_id, count in stats["channels"].most_common(top)]
+        users = [f"`{count}` <@{user_id}>" for user_id, count in stats["users"].most_common(top)]
+        
+        embed.add_field(name="Produits", value="\n".join(products)[:1024] or "Aucun", inline=False)
+        embed.add_field(name="Salons", value="\n".join(channels) or "Aucun", inline=True)
+        embed.add_field(name="Membres", value="\n".join(users) or "Aucun", inline=True)
+        
+        await ctx.send(embed=embed)
+    
     @studiosport_settings.command(name="test")
     async def test_link(self, ctx, url: str = None):
         """
-        Teste la transformation d'un lien StudioSport
+        Teste la transformation d'un lien marchand
         
         Exemple: [p]studiosport test https://www.studiosport.fr/exemple
         """
         if not url:
             url = "https://www.studiosport.fr/exemple-produit.html"
         
-        if not self.studiosport_pattern.match(url):
-            await ctx.send("❌ Ce n'est pas un lien StudioSport valide.")
+        settings = await self.get_guild_settings(ctx.guild)
+        if not self.match_merchant(settings["rules"], url):
+            await ctx.send("❌ Ce n'est pas un lien d'un marchand partenaire.")
             return
         
         affiliate_link = await self.add_utm_params(ctx.guild, url)
@@ -172,8 +542,82 @@ class StudiosportAffiliate(commands.Cog):
         embed.add_field(name="UTM Source", value=f"`{config['utm_source']}`", inline=True)
         embed.add_field(name="UTM Medium", value=f"`{config['utm_medium']}`", inline=True)
         embed.add_field(name="UTM Campaign", value=f"`{config['utm_campaign']}`", inline=True)
+        embed.add_field(name="Marchands", value=str(len(config["merchants"]) + 1), inline=True)
+        window = f"{config['coalesce_window']}s" if config["coalesce_window"] else "Désactivé"
+        embed.add_field(name="Regroupement", value=window, inline=True)
         
         await ctx.send(embed=embed)
 
+    @studiosport_settings.group(name="merchant", aliases=["marchand"])
+    async def merchant_settings(self, ctx):
+        """
+        Gestion des marchands partenaires
+        """
+        pass
+    
+    @merchant_settings.command(name="add")
+    async def add_merchant(self, ctx, domain: str, params: str, *, message: str = None):
+        """
+        Ajoute ou remplace un marchand
+        
+        Exemple: [p]studiosport merchant add decathlon.fr utm_source=bandolovers&utm_medium=affiliation Profite du partenariat Decathlon !
+        """
+        domain = domain.lower().strip()
+        if domain.startswith("www."):
+            domain = domain[4:]
+        if "." not in domain or "/" in domain:
+            await ctx.send("❌ Domaine invalide (exemple : `decathlon.fr`).")
+            return
+        
+        async with self.config.guild(ctx.guild).merchants() as merchants:
+            merchants[domain] = {
+                "name": domain,
+                "params": params.lstrip("?&"),
+                "message": message,
+            }
+        self.invalidate_guild(ctx.guild)
+        await ctx.send(f"✅ Marchand `{domain}` enregistré.")
+    
+    @merchant_settings.command(name="remove")
+    async def remove_merchant(self, ctx, domain: str):
+        """
+        Retire un marchand
+        """
+        domain = domain.lower().strip()
+        async with self.config.guild(ctx.guild).merchants() as merchants:
+            if merchants.pop(domain, None) is None:
+                await ctx.send(f"❌ Aucun marchand `{domain}`.")
+                return
+        self.invalidate_guild(ctx.guild)
+        await ctx.send(f"✅ Marchand `{domain}` retiré.")
+    
+    @merchant_settings.command(name="list")
+    async def list_merchants(self, ctx):
+        """
+        Liste les marchands configurés
+        """
+        settings = await self.get_guild_settings(ctx.guild)
+        lines = [
+            f"• `{domain}` → `{rule['params']}`"
+            for domain, rule in sorted(settings["rules"].items())
+        ]
+        for page in pagify("\n".join(lines)):
+            await ctx.send(page)
+
+    async def cog_unload(self):
+        """
+        Envoie les liens encore en attente et écrit les statistiques avant le déchargement
+        """
+        # Laisse finir une écriture en cours au lieu de l'interrompre
+        self.stats_stopping.set()
+        await self.stats_task
+
+        for channel_id, pending in list(self.pending.items()):
+            pending["task"].cancel()
+            try:
+                await self.flush_pending(channel_id)
+            except discord.HTTPException:
+                pass
+
 def setup(bot):
     bot.add_cog(StudiosportAffiliate(bot))